@@ -1,25 +1,138 @@
 from flask import Flask
 from pymongo import MongoClient
+from app.admission import AdmissionController
+from app.repositories import MongoSurveyRepository, SQLiteSurveyRepository
+from app.archive import ResponseArchive
+from app.analytics import ResultCache
+from app.shared_cache import SharedResultCache
+from app.json_provider import FastJSONProvider
+from app.live import DashboardBroadcaster, DashboardFollower
+from app.spool import WriteSpool, SpoolReplayer
+from app.query_profiler import QueryProfiler
+from app import columnar
 import os
+import tempfile
 
 
 def create_app():
     app = Flask(__name__)
     
+    # ObjectId/datetime-aware JSON, using orjson when installed
+    app.json = FastJSONProvider(app)
+    
     # Configuration
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
     app.config['MONGO_URI'] = os.environ.get('MONGO_URI', 'mongodb://mongodb:27017/healthcare_survey')
+    app.config['MONGO_WRITE_TIMEOUT_MS'] = int(os.environ.get('MONGO_WRITE_TIMEOUT_MS', 2000))
+    
+    # Admission control for database work. The in-flight count is per worker,
+    # so the limit must stay below gunicorn's --threads (8 in the Dockerfile)
+    app.admission = AdmissionController(
+        max_in_flight=int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', 3)),
+        latency_threshold_ms=int(os.environ.get('ADMISSION_LATENCY_MS', 500)),
+        retry_after=int(os.environ.get('ADMISSION_RETRY_AFTER', 5))
+    )
+    
+    # Initialize storage backend
+    app.config['STORAGE_BACKEND'] = os.environ.get('STORAGE_BACKEND', 'mongodb').lower()
+    app.config['SQLITE_PATH'] = os.environ.get('SQLITE_PATH', 'data/healthcare_survey.db')
+    app.db = None
+    app.repository = None
+    app.query_profiler = None
+    
+    if app.config['STORAGE_BACKEND'] == 'sqlite':
+        app.repository = SQLiteSurveyRepository(app.config['SQLITE_PATH'])
+        print(f"Using SQLite database at {app.config['SQLITE_PATH']}")
+    else:
+        # Per-query-shape latency statistics and slow-query log
+        listeners = []
+        if os.environ.get('QUERY_PROFILER_ENABLED', 'True').lower() in ['true', '1', 't']:
+            app.query_profiler = QueryProfiler(
+                stats_path=os.environ.get('QUERY_STATS_PATH', 'data/query_stats'),
+                slow_ms=int(os.environ.get('QUERY_SLOW_MS', 100)),
+                explain_interval=int(os.environ.get('QUERY_EXPLAIN_INTERVAL', 300))
+            )
+            listeners.append(app.query_profiler)
+        try:
+            client = MongoClient(app.config['MONGO_URI'], event_listeners=listeners)
+            if app.query_profiler is not None:
+                app.query_profiler.attach(client)
+            # Kept even if MongoDB is down now: requests that fail with an
+            # unavailable error are spooled, and the replayer keeps retrying
+            app.repository = MongoSurveyRepository(client.healthcare_survey,
+                                                   write_timeout_ms=app.config['MONGO_WRITE_TIMEOUT_MS'])
+            app.db = client.healthcare_survey
+        except Exception as e:
+            print(f"Failed to connect to MongoDB: {e}")
+        
+        if app.repository is not None:
+            try:
+                # Test connection
+                client.admin.command('ping')
+                app.repository.ensure_indexes()
+                print("Connected to MongoDB successfully!")
+                print(f"Columnar reads from MongoDB decoded with {columnar.mongo_decoder()}")
+            except Exception as e:
+                print(f"MongoDB is not reachable yet, submissions will be spooled until it is: {e}")
+    
+    # Local write-ahead spool for submissions while MongoDB is unavailable or slow
+    app.config['SPOOL_PATH'] = os.environ.get('SPOOL_PATH', 'data/spool')
+    app.spool = None
+    spool_enabled = os.environ.get('SPOOL_ENABLED', 'True').lower() in ['true', '1', 't']
+    if app.config['STORAGE_BACKEND'] != 'sqlite' and spool_enabled:
+        app.spool = WriteSpool(app.config['SPOOL_PATH'],
+                               group_commit_ms=int(os.environ.get('SPOOL_GROUP_COMMIT_MS', 2)))
+        if app.repository is not None:
+            SpoolReplayer(app.spool, app.repository,
+                          interval=float(os.environ.get('SPOOL_REPLAY_INTERVAL', 1))).start()
+    
+    # Cold tier of archived responses in Parquet
+    app.config['ARCHIVE_PATH'] = os.environ.get('ARCHIVE_PATH', 'archive')
+    app.archive = ResponseArchive(
+        app.config['ARCHIVE_PATH'],
+        hot_contains=(lambda response_id: app.repository.find_by_id(response_id) is not None)
+        if app.repository is not None else None
+    )
+    
+    # Dashboard and cross-tab results keyed by query and collection version,
+    # shared by all workers on the host through a memory-mapped file
+    default_cache_dir = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    app.config['SHARED_CACHE_PATH'] = os.environ.get(
+        'SHARED_CACHE_PATH', os.path.join(default_cache_dir, 'healthcare_survey_cache')
+    )
+    app.analytics_cache = None
+    if os.environ.get('SHARED_CACHE_ENABLED', 'True').lower() in ['true', '1', 't']:
+        try:
+            app.analytics_cache = SharedResultCache(
+                app.config['SHARED_CACHE_PATH'],
+                dumps=app.json.dumps,
+                # Results are only valid for the database they were computed from
+                namespace=app.config['SQLITE_PATH'] if app.config['STORAGE_BACKEND'] == 'sqlite' else app.config['MONGO_URI'],
+                slots=int(os.environ.get('SHARED_CACHE_SLOTS', 64)),
+                slot_size=int(os.environ.get('SHARED_CACHE_SLOT_KB', 256)) * 1024
+            )
+        except OSError as e:
+            print(f"Shared statistics cache unavailable, using a per-worker cache: {e}")
+    if app.analytics_cache is None:
+        app.analytics_cache = ResultCache(max_entries=int(os.environ.get('ANALYTICS_CACHE_ENTRIES', 256)))
+    
+    # Live dashboard totals shared by every SSE client of this worker. In
+    # docker-compose the streams are served by a separate gevent process
+    # (DASHBOARD_STREAM_FOLLOW=True) that follows the database for new responses
+    app.dashboard_stream = DashboardBroadcaster(
+        dumps=app.json.dumps,
+        resync_interval=int(os.environ.get('DASHBOARD_RESYNC_SECONDS', 60)),
+        max_clients=int(os.environ.get('DASHBOARD_STREAM_MAX_CLIENTS', 1000))
+    )
+    if os.environ.get('DASHBOARD_STREAM_FOLLOW', 'False').lower() in ['true', '1', 't'] and app.repository is not None:
+        DashboardFollower(app.repository, app.dashboard_stream,
+                          interval=float(os.environ.get('DASHBOARD_FOLLOW_INTERVAL', 1))).start()
     
-    # Initialize MongoDB connection
-    try:
-        client = MongoClient(app.config['MONGO_URI'])
-        app.db = client.healthcare_survey
-        # Test connection
-        client.admin.command('ping')
-        print("Connected to MongoDB successfully!")
-    except Exception as e:
-        print(f"Failed to connect to MongoDB: {e}")
-        app.db = None
+    # Rendered-page cache and fingerprinted static URLs
+    from app.caching import PageCache, init_static_fingerprints
+    debug = os.environ.get('FLASK_DEBUG', 'False').lower() in ['true', '1', 't']
+    app.page_cache = PageCache(enabled=os.environ.get('PAGE_CACHE_ENABLED', str(not debug)).lower() in ['true', '1', 't'])
+    init_static_fingerprints(app)
     
     # Register blueprints
     from app.routes import bp as main_bp
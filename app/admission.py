@@ -0,0 +1,88 @@
+"""
+Admission control for database work.
+
+Tracks how many MongoDB operations are in flight in this worker and a moving
+average of their latency. When either crosses its limit, low-priority
+endpoints are shed with a 503 so survey submissions keep a worker free.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, jsonify
+
+
+class AdmissionController:
+    def __init__(self, max_in_flight=3, latency_threshold_ms=500, retry_after=5,
+                 smoothing=0.2, stale_after=10):
+        self.max_in_flight = max_in_flight
+        self.latency_threshold_ms = latency_threshold_ms
+        self.retry_after = retry_after
+        self.smoothing = smoothing
+        self.stale_after = stale_after
+        self.in_flight = 0
+        self.avg_latency_ms = 0.0
+        self._last_sample = 0.0
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def track(self, record_latency=True):
+        """
+        Count a database operation as in flight and record its latency.
+
+        Full scans take long because of their size rather than database
+        health, so they can opt out of the latency average.
+        """
+        with self._lock:
+            self.in_flight += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.monotonic() - started) * 1000
+            with self._lock:
+                self.in_flight -= 1
+                if record_latency:
+                    self.avg_latency_ms += self.smoothing * (elapsed_ms - self.avg_latency_ms)
+                    self._last_sample = time.monotonic()
+    
+    def is_overloaded(self):
+        if self.in_flight >= self.max_in_flight:
+            return True
+        
+        # Without fresh samples (e.g. everything is being shed) assume recovery
+        if time.monotonic() - self._last_sample > self.stale_after:
+            return False
+        return self.avg_latency_ms > self.latency_threshold_ms
+    
+    def get_status(self):
+        return {
+            'in_flight': self.in_flight,
+            'avg_latency_ms': round(self.avg_latency_ms, 1),
+            'overloaded': self.is_overloaded()
+        }
+
+
+def track_db_operation(record_latency=True):
+    """Context manager tracking a database call against the current app's controller"""
+    return current_app.admission.track(record_latency)
+
+
+def shed_when_overloaded(view):
+    """Reject a low-priority endpoint with 503 and Retry-After while the database is overloaded"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        admission = current_app.admission
+        if admission.is_overloaded():
+            current_app.logger.warning(f"Shedding {view.__name__}: {admission.get_status()}")
+            response = jsonify({
+                'success': False,
+                'error': 'Service is temporarily overloaded. Please retry later.'
+            })
+            response.status_code = 503
+            response.headers['Retry-After'] = str(admission.retry_after)
+            return response
+        return view(*args, **kwargs)
+    return wrapper
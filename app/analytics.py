@@ -0,0 +1,180 @@
+"""
+Server-side cross-tab analytics.
+
+Groups responses by any of the DIMENSIONS below and reports count, sum and
+mean of the income and expense fields per group. Each backend computes
+per-group counts and sums in a single query; the archive tier contributes the
+same partial aggregates, so the tiers can be merged before means are derived.
+"""
+
+import threading
+from collections import OrderedDict
+
+from app.schema import EXPENSE_CATEGORIES
+
+# (lowest value, highest value inclusive, label); the notebook's age groups
+AGE_BUCKETS = [
+    (0, 25, '18-25'),
+    (26, 35, '26-35'),
+    (36, 45, '36-45'),
+    (46, 55, '46-55'),
+    (56, 70, '56-70'),
+    (71, None, '71+')
+]
+
+INCOME_BANDS = [
+    (0, 2000, '<2000'),
+    (2000, 4000, '2000-3999'),
+    (4000, 6000, '4000-5999'),
+    (6000, 10000, '6000-9999'),
+    (10000, None, '10000+')
+]
+
+DIMENSIONS = ['age_bucket', 'gender', 'income_band']
+FIELDS = ['total_income'] + EXPENSE_CATEGORIES
+MEASURES = ['mean', 'sum', 'count']
+
+
+def mongo_dimension_expressions():
+    """$switch expressions computing each dimension from normalized fields"""
+    return {
+        'age_bucket': {'$switch': {
+            'branches': [
+                {'case': {'$lte': ['$age', high]}, 'then': label}
+                for low, high, label in AGE_BUCKETS if high is not None
+            ],
+            'default': AGE_BUCKETS[-1][2]
+        }},
+        'gender': '$gender',
+        'income_band': {'$switch': {
+            'branches': [
+                {'case': {'$lt': ['$total_income', high]}, 'then': label}
+                for low, high, label in INCOME_BANDS if high is not None
+            ],
+            'default': INCOME_BANDS[-1][2]
+        }}
+    }
+
+
+def sql_dimension_expressions():
+    """SQL CASE expressions computing each dimension from table columns"""
+    age_cases = ' '.join(
+        f"WHEN age <= {high} THEN '{label}'" for low, high, label in AGE_BUCKETS if high is not None
+    )
+    income_cases = ' '.join(
+        f"WHEN total_income < {high} THEN '{label}'" for low, high, label in INCOME_BANDS if high is not None
+    )
+    return {
+        'age_bucket': f"CASE {age_cases} ELSE '{AGE_BUCKETS[-1][2]}' END",
+        'gender': 'gender',
+        'income_band': f"CASE {income_cases} ELSE '{INCOME_BANDS[-1][2]}' END"
+    }
+
+
+def frame_groups(frame, dimensions, fields):
+    """Partial aggregates for a pandas DataFrame with the archive's flat columns"""
+    import numpy as np
+    import pandas as pd
+    
+    if frame.empty:
+        return []
+    
+    frame = frame.copy()
+    if 'age_bucket' in dimensions:
+        edges = [-np.inf] + [high for low, high, label in AGE_BUCKETS if high is not None] + [np.inf]
+        frame['age_bucket'] = pd.cut(frame['age'], edges, right=True, labels=[label for _, _, label in AGE_BUCKETS])
+    if 'income_band' in dimensions:
+        edges = [-np.inf] + [high for low, high, label in INCOME_BANDS if high is not None] + [np.inf]
+        frame['income_band'] = pd.cut(frame['total_income'], edges, right=False,
+                                      labels=[label for _, _, label in INCOME_BANDS])
+    frame['gender'] = frame['gender'].astype(str)
+    
+    if not dimensions:
+        return [{'key': {}, 'count': len(frame), 'sums': {field: float(frame[field].sum()) for field in fields}}]
+    
+    grouped = frame.groupby(dimensions, observed=True)
+    summary = grouped[fields].sum()
+    summary['count'] = grouped.size()
+    return [
+        {
+            'key': {dimension: str(record[dimension]) for dimension in dimensions},
+            'count': int(record['count']),
+            'sums': {field: float(record[field]) for field in fields}
+        }
+        for record in summary.reset_index().to_dict('records')
+    ]
+
+
+def merge_groups(*group_lists):
+    """
+    Merge partial aggregates from several tiers.
+    
+    Each group is {'key': {dimension: value}, 'count': n, 'sums': {field: total}}.
+    """
+    merged = {}
+    for groups in group_lists:
+        for group in groups:
+            key = tuple(sorted(group['key'].items()))
+            if key not in merged:
+                merged[key] = {'key': dict(group['key']), 'count': 0, 'sums': {}}
+            target = merged[key]
+            target['count'] += group['count']
+            for field, total in group['sums'].items():
+                target['sums'][field] = target['sums'].get(field, 0) + total
+    return list(merged.values())
+
+
+def format_rows(groups, dimensions, fields, measures):
+    """Turn merged partial aggregates into response rows sorted by dimension values"""
+    rows = []
+    for group in groups:
+        row = {dimension: group['key'].get(dimension) for dimension in dimensions}
+        row['count'] = group['count']
+        for field in fields:
+            total = group['sums'].get(field, 0)
+            values = {
+                'sum': round(total, 2),
+                'mean': round(total / group['count'], 2) if group['count'] else 0,
+                'count': group['count']
+            }
+            row[field] = {measure: values[measure] for measure in measures}
+        rows.append(row)
+    
+    rows.sort(key=lambda row: [str(row[dimension]) for dimension in dimensions])
+    return rows
+
+
+class ResultCache:
+    """
+    Bounded LRU cache for analytics results.
+    
+    Keys include the collection version, so any write makes older entries
+    unreachable and they simply age out.
+    """
+    
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+    
+    def get_or_compute(self, key, version, compute):
+        """Same interface as app.shared_cache.SharedResultCache, for this worker only"""
+        cached = self.get((key, version))
+        if cached is not None:
+            return cached, True
+        return self.set((key, version), compute()), False
@@ -0,0 +1,316 @@
+"""
+Cold storage tier for old survey responses.
+
+Responses moved out of the hot collection are written to compressed Parquet
+files partitioned by creation date:
+
+    <archive>/date=2025-01-31/part-<first id>.parquet
+    <archive>/catalog.json
+
+The catalog lists every partition file with its date, row count and
+pre-computed dashboard aggregates. Readers use it to prune partitions by date
+and to answer statistics without opening any Parquet file.
+
+Archiving is two-phase: a partition is added to the catalog as 'pending',
+the hot copies are deleted, and only then is it marked 'committed'. Readers
+skip a pending partition while its first response is still in the hot tier
+(checked through `hot_contains`), so a response is never counted twice, and
+read it once the hot copies are gone, so none disappears before the commit.
+An interrupted job finishes the deletes of pending partitions on its next run.
+"""
+
+import copy
+import json
+import os
+import threading
+from datetime import datetime
+
+from bson import ObjectId
+
+from app.schema import EXPENSE_CATEGORIES
+from app.analytics import frame_groups
+
+CATALOG_FILE = 'catalog.json'
+COLUMNS = ['id', 'age', 'gender', 'total_income'] + EXPENSE_CATEGORIES + ['created_at']
+
+
+def summarize(docs):
+    """Dashboard aggregates for a list of response documents"""
+    summary = {
+        'count': len(docs),
+        'age_sum': 0,
+        'income_sum': 0.0,
+        'gender_counts': {},
+        'expense_sums': {category: 0.0 for category in EXPENSE_CATEGORIES}
+    }
+    for doc in docs:
+        summary['age_sum'] += doc['age']
+        summary['income_sum'] += doc['total_income']
+        summary['gender_counts'][doc['gender']] = summary['gender_counts'].get(doc['gender'], 0) + 1
+        for category in EXPENSE_CATEGORIES:
+            summary['expense_sums'][category] += doc['expenses'].get(category, 0)
+    return summary
+
+
+def merge_statistics(stats, summary):
+    """Combine hot-tier dashboard statistics with an archive summary"""
+    if not summary['count']:
+        return stats
+    
+    hot_count = stats['total_responses']
+    total = hot_count + summary['count']
+    gender_distribution = dict(stats['gender_distribution'])
+    for gender, count in summary['gender_counts'].items():
+        gender_distribution[gender] = gender_distribution.get(gender, 0) + count
+    
+    return {
+        'total_responses': total,
+        'avg_age': (stats['avg_age'] * hot_count + summary['age_sum']) / total,
+        'avg_income': (stats['avg_income'] * hot_count + summary['income_sum']) / total,
+        'gender_distribution': gender_distribution,
+        'expense_totals': {
+            category: stats['expense_totals'].get(category, 0) + summary['expense_sums'][category]
+            for category in EXPENSE_CATEGORIES
+        }
+    }
+
+
+def _frame_documents(frame):
+    """Archive rows in the SurveyResponse document shape"""
+    return [
+        {
+            '_id': ObjectId(row['id']),
+            'age': int(row['age']),
+            'gender': str(row['gender']),
+            'total_income': float(row['total_income']),
+            'expenses': {category: float(row[category]) for category in EXPENSE_CATEGORIES},
+            'created_at': row['created_at'].to_pydatetime()
+        }
+        for row in frame.to_dict('records')
+    ]
+
+
+def _criteria_filters(min_age, max_age, gender, min_income, max_income):
+    """pyarrow row filters for the criteria stored as Parquet columns, or None"""
+    filters = [
+        (column, operator, value)
+        for column, operator, value in [('age', '>=', min_age), ('age', '<=', max_age),
+                                        ('gender', '==', gender.lower() if gender else None),
+                                        ('total_income', '>=', min_income),
+                                        ('total_income', '<=', max_income)]
+        if value is not None
+    ]
+    return filters or None
+
+
+class ResponseArchive:
+    def __init__(self, path, compression='zstd', hot_contains=None):
+        self.path = path
+        self.compression = compression
+        # Callable telling whether a response id is still in the hot tier
+        self.hot_contains = hot_contains
+        self._lock = threading.Lock()
+        self._catalog_cache = (None, None)
+    
+    @property
+    def catalog_path(self):
+        return os.path.join(self.path, CATALOG_FILE)
+    
+    def load_catalog(self):
+        # Re-parse only when the archive job has replaced the file
+        try:
+            mtime = os.stat(self.catalog_path).st_mtime_ns
+        except FileNotFoundError:
+            return {'partitions': []}
+        
+        cached_mtime, catalog = self._catalog_cache
+        if cached_mtime != mtime:
+            with open(self.catalog_path, encoding='utf-8') as f:
+                catalog = json.load(f)
+            self._catalog_cache = (mtime, catalog)
+        return copy.deepcopy(catalog)
+    
+    def generation(self):
+        """Changes whenever the catalog is rewritten; part of the analytics cache key"""
+        try:
+            return os.stat(self.catalog_path).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+    
+    def _save_catalog(self, catalog):
+        os.makedirs(self.path, exist_ok=True)
+        temp_path = self.catalog_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(catalog, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.catalog_path)
+    
+    def partitions(self, start=None, end=None, include_pending=False):
+        """Catalog entries whose date falls in [start, end], both optional dates"""
+        selected = []
+        for partition in self.load_catalog()['partitions']:
+            if partition['status'] != 'committed' and not include_pending and not self._pending_visible(partition):
+                continue
+            if start and partition['date'] < start.isoformat()[:10]:
+                continue
+            if end and partition['date'] > end.isoformat()[:10]:
+                continue
+            selected.append(partition)
+        return selected
+    
+    def _pending_visible(self, partition):
+        # Every response of a batch is deleted from the hot tier in one call,
+        # so checking the first one tells whether the archive job got that far
+        if self.hot_contains is None:
+            return False
+        first_id = partition.get('first_id') or partition['file'].rsplit('part-', 1)[1][:-len('.parquet')]
+        return not self.hot_contains(ObjectId(first_id))
+    
+    def write_pending(self, docs):
+        """
+        Write documents to Parquet, one file per creation date, and register
+        them in the catalog as pending. Returns the new catalog entries.
+        """
+        import pandas as pd
+        
+        by_date = {}
+        for doc in docs:
+            by_date.setdefault(doc['created_at'].date().isoformat(), []).append(doc)
+        
+        entries = []
+        for date, date_docs in sorted(by_date.items()):
+            directory = os.path.join(self.path, f'date={date}')
+            os.makedirs(directory, exist_ok=True)
+            file_name = os.path.join(f'date={date}', f"part-{date_docs[0]['_id']}.parquet")
+            
+            frame = pd.DataFrame({
+                'id': [str(doc['_id']) for doc in date_docs],
+                'age': pd.array([doc['age'] for doc in date_docs], dtype='int16'),
+                'gender': pd.Categorical([doc['gender'] for doc in date_docs]),
+                'total_income': [doc['total_income'] for doc in date_docs],
+                **{
+                    category: [doc['expenses'].get(category, 0) for doc in date_docs]
+                    for category in EXPENSE_CATEGORIES
+                },
+                'created_at': [doc['created_at'] for doc in date_docs]
+            })
+            frame.to_parquet(os.path.join(self.path, file_name), compression=self.compression, index=False)
+            
+            entries.append({
+                'file': file_name,
+                'first_id': str(date_docs[0]['_id']),
+                'date': date,
+                'rows': len(date_docs),
+                'status': 'pending',
+                'archived_at': datetime.utcnow().isoformat(),
+                'summary': summarize(date_docs)
+            })
+        
+        with self._lock:
+            catalog = self.load_catalog()
+            catalog['partitions'].extend(entries)
+            self._save_catalog(catalog)
+        return entries
+    
+    def read_ids(self, entry):
+        import pandas as pd
+        
+        frame = pd.read_parquet(os.path.join(self.path, entry['file']), columns=['id'])
+        return [ObjectId(value) for value in frame['id']]
+    
+    def mark_committed(self, entries):
+        files = {entry['file'] for entry in entries}
+        with self._lock:
+            catalog = self.load_catalog()
+            for partition in catalog['partitions']:
+                if partition['file'] in files:
+                    partition['status'] = 'committed'
+            self._save_catalog(catalog)
+    
+    def delete_all(self):
+        """Remove every partition, pending ones included; returns the number of committed rows removed"""
+        import shutil
+        
+        with self._lock:
+            partitions = self.load_catalog()['partitions']
+            self._save_catalog({'partitions': []})
+        for directory in {os.path.dirname(partition['file']) for partition in partitions}:
+            shutil.rmtree(os.path.join(self.path, directory), ignore_errors=True)
+        return sum(partition['rows'] for partition in partitions if partition['status'] == 'committed')
+    
+    def summary(self):
+        """Merged dashboard aggregates of every committed partition"""
+        merged = summarize([])
+        for partition in self.partitions():
+            part = partition['summary']
+            merged['count'] += part['count']
+            merged['age_sum'] += part['age_sum']
+            merged['income_sum'] += part['income_sum']
+            for gender, count in part['gender_counts'].items():
+                merged['gender_counts'][gender] = merged['gender_counts'].get(gender, 0) + count
+            for category in EXPENSE_CATEGORIES:
+                merged['expense_sums'][category] += part['expense_sums'][category]
+        return merged
+    
+    def read_frame(self, start=None, end=None, filters=None, columns=None):
+        """
+        Load committed partitions into one DataFrame.
+        
+        Partitions outside [start, end] are pruned using the catalog; `filters`
+        are pyarrow row filters such as [('age', '>=', 30)] pushed down into
+        the Parquet reader.
+        """
+        import pandas as pd
+        
+        frames = [
+            pd.read_parquet(os.path.join(self.path, partition['file']), columns=columns, filters=filters)
+            for partition in self.partitions(start, end)
+        ]
+        frames = [frame for frame in frames if len(frame)]
+        if not frames:
+            return pd.DataFrame(columns=columns or COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+    
+    def find_all(self, filters=None):
+        """Archived responses in the SurveyResponse document shape"""
+        return _frame_documents(self.read_frame(filters=filters))
+    
+    def find_by_id(self, response_id):
+        """An archived response, found through the Parquet statistics of the id column"""
+        docs = self.find_all(filters=[('id', '==', str(response_id))])
+        return docs[0] if docs else None
+    
+    def iter_record_batches(self, columns=None, batch_size=None, min_age=None, max_age=None, gender=None,
+                            min_income=None, max_income=None, overspending=None,
+                            min_health_score=None, max_health_score=None):
+        """Committed partitions as app.columnar RecordBatches, reading only the needed columns and row groups"""
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+        from app import columnar
+        
+        target = columnar.select_schema(columns)
+        batch_size = batch_size or columnar.DEFAULT_BATCH_SIZE
+        filters = _criteria_filters(min_age, max_age, gender, min_income, max_income)
+        derived = {'overspending': overspending, 'min_health_score': min_health_score,
+                   'max_health_score': max_health_score}
+        
+        files = [os.path.join(self.path, partition['file']) for partition in self.partitions()]
+        if not files:
+            return
+        # One scan over every partition, so small files are read in parallel
+        dataset = ds.dataset(files, format='parquet')
+        scanner = dataset.scanner(columns=columnar.needed_columns(target.names, derived),
+                                  filter=pq.filters_to_expression(filters) if filters else None,
+                                  batch_size=batch_size)
+        for batch in scanner.to_batches():
+            mask = columnar.derived_mask(batch, **derived)
+            if mask is not None:
+                batch = batch.filter(mask)
+            if len(batch):
+                yield batch.select(target.names).cast(target)
+    
+    def crosstab(self, dimensions, fields):
+        """Partial aggregates over committed partitions, reading only the needed columns"""
+        columns = sorted({'age', 'gender', 'total_income', *fields})
+        return frame_groups(self.read_frame(columns=columns), dimensions, fields)
@@ -0,0 +1,126 @@
+"""
+Rendered-page caching and content-hashed static asset URLs.
+
+Pages that do not depend on the request are rendered once per worker and
+served from memory afterwards. Static files get a `?v=<hash>` query string
+derived from their contents so they can be cached by browsers forever.
+"""
+
+import hashlib
+import os
+import threading
+
+from flask import current_app, request, session, render_template, make_response
+from flask_wtf.csrf import generate_csrf
+
+# One year, the conventional "never expires" value for fingerprinted assets
+STATIC_MAX_AGE = 365 * 24 * 60 * 60
+
+CSRF_PLACEHOLDER = '__csrf_token_placeholder__'
+
+
+class PageCache:
+    """Thread-safe in-process store of rendered HTML keyed by page name"""
+    
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._pages = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        return self._pages.get(key) if self.enabled else None
+    
+    def set(self, key, html):
+        if self.enabled:
+            with self._lock:
+                self._pages[key] = html
+        return html
+    
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+
+def _has_pending_flashes():
+    # base.html renders flashed messages, so such pages are never shared
+    return bool(session.get('_flashes'))
+
+
+def render_cached_page(key, template, **context):
+    """Render a fully static page, serving it from the page cache when possible"""
+    if _has_pending_flashes():
+        return render_template(template, **context)
+    
+    cache = current_app.page_cache
+    html = cache.get(key)
+    if html is None:
+        html = cache.set(key, render_template(template, **context))
+    
+    response = make_response(html)
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+def render_cached_form(key, template, form_factory, **context):
+    """
+    Render an empty form page, caching everything except the CSRF token.
+    
+    The form markup is identical for every visitor apart from the per-session
+    CSRF token, so the cached copy stores a placeholder that is swapped for a
+    fresh token on each request. The form object is only built on a miss.
+    """
+    if _has_pending_flashes():
+        return render_template(template, form=form_factory(), **context)
+    
+    cache = current_app.page_cache
+    html = cache.get(key)
+    if html is None:
+        rendered = render_template(template, form=form_factory(), **context)
+        html = cache.set(key, rendered.replace(generate_csrf(), CSRF_PLACEHOLDER))
+    
+    response = make_response(html.replace(CSRF_PLACEHOLDER, generate_csrf()))
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+_fingerprints = {}
+
+
+def static_fingerprint(static_folder, filename):
+    """Return a short content hash for a static file, recomputed only when it changes"""
+    path = os.path.join(static_folder, filename)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    
+    cached = _fingerprints.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:12]
+    _fingerprints[path] = (mtime, digest)
+    return digest
+
+
+def init_static_fingerprints(app):
+    """Add content hashes to static URLs and serve matching requests with far-future caching"""
+    
+    @app.url_defaults
+    def add_static_fingerprint(endpoint, values):
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            fingerprint = static_fingerprint(app.static_folder, values['filename'])
+            if fingerprint:
+                values['v'] = fingerprint
+    
+    @app.after_request
+    def add_static_cache_headers(response):
+        if request.endpoint == 'static' and response.status_code == 200:
+            fingerprint = static_fingerprint(app.static_folder, request.view_args['filename'])
+            if fingerprint and request.args.get('v') == fingerprint:
+                response.cache_control.no_cache = None
+                response.cache_control.public = True
+                response.cache_control.max_age = STATIC_MAX_AGE
+                response.cache_control.immutable = True
+        return response
@@ -0,0 +1,143 @@
+"""
+Columnar bulk reads of survey responses.
+
+Analytics paths read every response, and turning each one into a dict, a
+SurveyResponse and a User costs far more than the work done on it. Instead,
+every storage tier can return pyarrow RecordBatches in one flat schema:
+
+    id, age, gender, total_income, utilities, ..., healthcare, created_at
+
+via iter_record_batches(columns=None, batch_size=..., **criteria), where
+`columns` selects a subset and `criteria` takes min_age, max_age, gender,
+min_income, max_income, overspending, min_health_score and max_health_score.
+Both are pushed down into the tier:
+
+    MongoDB   $match and $project in an aggregation, so only the requested
+              fields leave the server, already converted from the compact
+              schema. PyMongoArrow (in requirements.txt) decodes each
+              raw BSON batch from the server straight into Arrow arrays;
+              where it cannot be installed, each batch is transposed into
+              columns from small flat documents. mongo_decoder() reports
+              which path is active.
+    SQLite    a SELECT of the requested columns with a WHERE clause.
+    Archive   Parquet column selection and row-group filters.
+"""
+
+import numpy as np
+import pyarrow as pa
+
+from app.schema import EXPENSE_CATEGORIES
+
+try:
+    from pymongoarrow.context import PyMongoArrowContext
+    from pymongoarrow.lib import process_bson_stream
+    from pymongoarrow.schema import Schema
+except ImportError:
+    Schema = None
+
+ARROW_SCHEMA = pa.schema(
+    [('id', pa.string()), ('age', pa.int64()), ('gender', pa.string()), ('total_income', pa.float64())]
+    + [(category, pa.float64()) for category in EXPENSE_CATEGORIES]
+    + [('created_at', pa.timestamp('us'))]
+)
+COLUMNS = ARROW_SCHEMA.names
+
+DEFAULT_BATCH_SIZE = 50000
+
+# Criteria that need the income and expense columns to be evaluated outside a database
+DERIVED_CRITERIA = ('overspending', 'min_health_score', 'max_health_score')
+
+
+def select_schema(columns=None):
+    """ARROW_SCHEMA restricted to `columns`, in the order given"""
+    if columns is None:
+        return ARROW_SCHEMA
+    unknown = set(columns) - set(COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(sorted(unknown))}")
+    return pa.schema([ARROW_SCHEMA.field(name) for name in columns])
+
+
+def batch_from_columns(values, schema):
+    """RecordBatch from a dict of equal-length lists, NumPy arrays or Arrow arrays"""
+    arrays = []
+    for field in schema:
+        value = values[field.name]
+        if isinstance(value, pa.Array):
+            arrays.append(value.cast(field.type))
+        else:
+            arrays.append(pa.array(value, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def timestamps_from_iso(values):
+    """Timestamps parsed by Arrow from ISO 8601 strings, rather than one datetime at a time"""
+    return pa.array(values, type=pa.string()).cast(pa.timestamp('us'))
+
+
+def mongo_decoder():
+    """How MongoDB batches are decoded: 'pymongoarrow', or 'cursor' when it is not installed"""
+    return 'pymongoarrow' if Schema is not None else 'cursor'
+
+
+def pymongoarrow_schema(schema):
+    # BSON datetimes have millisecond precision; widened after reading
+    return Schema({
+        field.name: pa.timestamp('ms') if field.name == 'created_at' else field.type
+        for field in schema
+    })
+
+
+def iter_mongo_arrow_batches(collection, pipeline, schema, batch_size):
+    """
+    Run an aggregation and decode each raw BSON batch from the server into
+    Arrow with PyMongoArrow, so at most `batch_size` rows are held at a time
+    """
+    bson_schema = pymongoarrow_schema(schema)
+    for raw_batch in collection.aggregate_raw_batches(pipeline, batchSize=batch_size):
+        context = PyMongoArrowContext.from_schema(bson_schema, codec_options=collection.codec_options)
+        process_bson_stream(raw_batch, context)
+        table = context.finish()
+        if table.num_rows:
+            yield from table.select(schema.names).cast(schema).to_batches(max_chunksize=batch_size)
+
+
+def needed_columns(columns, criteria):
+    """Columns to read so that derived criteria can be evaluated on the batch"""
+    names = list(columns or COLUMNS)
+    if any(criteria.get(name) is not None for name in DERIVED_CRITERIA):
+        names += [name for name in ['total_income'] + EXPENSE_CATEGORIES if name not in names]
+    return names
+
+
+def derived_mask(data, overspending=None, min_health_score=None, max_health_score=None):
+    """
+    Row mask for the criteria computed from income and expenses, using the
+    same rules as User.is_overspending and app.schema.health_score.
+    Returns None when no such criteria are given.
+    """
+    if overspending is None and min_health_score is None and max_health_score is None:
+        return None
+    
+    total_income = data.column('total_income').to_numpy(zero_copy_only=False)
+    total_expenses = 0
+    for category in EXPENSE_CATEGORIES:
+        total_expenses = total_expenses + data.column(category).to_numpy(zero_copy_only=False)
+    
+    mask = np.ones(len(total_income), dtype=bool)
+    if overspending is not None:
+        mask &= (total_expenses > total_income) == bool(overspending)
+    if min_health_score is not None or max_health_score is not None:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(total_income > 0, total_expenses / total_income * 100, 0)
+        scores = np.select([ratio <= limit for limit in (50, 70, 90, 100)], [100, 80, 60, 40], 20)
+        if min_health_score is not None:
+            mask &= scores >= min_health_score
+        if max_health_score is not None:
+            mask &= scores <= max_health_score
+    return mask
+
+
+def read_table(batches, columns=None):
+    """Concatenate RecordBatches from iter_record_batches into one Table"""
+    return pa.Table.from_batches(list(batches), schema=select_schema(columns))
@@ -0,0 +1,76 @@
+"""
+JSON provider for API responses.
+
+Serializes ObjectId and datetime values natively, so routes can return
+documents straight from the repositories without copying each one to convert
+its fields. orjson is used when it is installed; otherwise the standard
+library encoder is used with the same conversions.
+"""
+
+from datetime import date, datetime
+
+import numpy as np
+from bson import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(o):
+    """Conversions for types the JSON encoders do not handle themselves"""
+    if isinstance(o, ObjectId):
+        return str(o)
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    if isinstance(o, np.generic):
+        return o.item()
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    return DefaultJSONProvider.default(o)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson when available.
+    
+    Keeps the behaviour of Flask's default provider (sorted keys, pretty
+    output in debug mode) but writes ISO 8601 dates instead of HTTP dates.
+    """
+    
+    default = staticmethod(_default)
+    
+    @property
+    def engine(self):
+        return 'orjson' if orjson is not None else 'json'
+    
+    def _options(self, indent=False):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+    
+    def dumps(self, obj, **kwargs):
+        # orjson has no equivalent for arbitrary json.dumps arguments
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self._options()).decode()
+    
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        # Build the body as bytes, skipping the str round trip
+        body = orjson.dumps(obj, default=_default, option=self._options(indent)) + b'\n'
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,219 @@
+"""
+Live admin dashboard updates over Server-Sent Events.
+
+Each worker keeps one DashboardBroadcaster holding the running dashboard
+totals (in the app.archive.summarize shape). Saving responses folds them into
+the totals and appends a single pre-encoded delta event to a shared buffer;
+every connected stream sends those same bytes, so the cost of an update does
+not grow with the number of open dashboards.
+
+Totals are loaded from the database once and then kept up to date in memory.
+Writes made by other workers or scripts are picked up by a periodic resync,
+which is sent to clients as a fresh snapshot.
+
+An open stream is an idle connection, so in production the stream endpoint is
+served by its own gevent worker (the `stream` service in docker-compose)
+rather than holding a thread of the web workers. That process takes no
+writes; a DashboardFollower feeds its broadcaster by reading newly inserted
+responses from the database instead.
+"""
+
+import copy
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+from app.archive import summarize, merge_statistics
+from app.repositories import empty_statistics
+
+logger = logging.getLogger(__name__)
+
+
+def statistics_from_totals(totals):
+    """Admin dashboard statistics, rounded like /admin/dashboard, from running totals"""
+    stats = merge_statistics(empty_statistics(), totals)
+    stats['avg_age'] = round(stats['avg_age'], 1)
+    stats['avg_income'] = round(stats['avg_income'], 2)
+    return stats
+
+
+def _add_totals(totals, delta):
+    totals['count'] += delta['count']
+    totals['age_sum'] += delta['age_sum']
+    totals['income_sum'] += delta['income_sum']
+    for gender, count in delta['gender_counts'].items():
+        totals['gender_counts'][gender] = totals['gender_counts'].get(gender, 0) + count
+    for category, amount in delta['expense_sums'].items():
+        totals['expense_sums'][category] = totals['expense_sums'].get(category, 0) + amount
+
+
+class DashboardBroadcaster:
+    def __init__(self, dumps, history=256, heartbeat=15, resync_interval=60, max_clients=1000):
+        self.dumps = dumps
+        self.heartbeat = heartbeat
+        self.resync_interval = resync_interval
+        self.max_clients = max_clients
+        self.clients = 0
+        self._events = deque(maxlen=history)
+        self._seq = 0
+        self._totals = None
+        self._loaded_at = 0.0
+        self.loads = 0
+        self.follower = None
+        self._condition = threading.Condition()
+        self._load_lock = threading.Lock()
+    
+    def _frame(self, event, payload, seq):
+        return f"id: {seq}\nevent: {event}\ndata: {self.dumps(payload)}\n\n".encode()
+    
+    def _snapshot_payload(self):
+        return {'totals': self._totals, 'statistics': statistics_from_totals(self._totals)}
+    
+    def _append(self, event, payload):
+        # Caller holds the condition
+        self._seq += 1
+        self._events.append((self._seq, self._frame(event, payload, self._seq)))
+        self._condition.notify_all()
+    
+    def try_reserve(self):
+        """Take a client slot, or return False when `max_clients` streams are open"""
+        with self._condition:
+            if self.clients >= self.max_clients:
+                return False
+            self.clients += 1
+            return True
+    
+    def release(self):
+        with self._condition:
+            self.clients -= 1
+    
+    def ensure_totals(self, loader, force=False):
+        """
+        Load the totals with `loader` if missing or due for a resync, and
+        broadcast them as a snapshot. Only one thread loads at a time.
+        """
+        if not force and self._totals is not None and time.monotonic() - self._loaded_at < self.resync_interval:
+            return
+        if not self._load_lock.acquire(blocking=self._totals is None):
+            return
+        try:
+            # The loader's result may be a cached object; deltas are added to a copy
+            totals = copy.deepcopy(loader())
+            with self._condition:
+                self._totals = totals
+                self._loaded_at = time.monotonic()
+                self.loads += 1
+                self._append('snapshot', self._snapshot_payload())
+        finally:
+            self._load_lock.release()
+    
+    def publish(self, docs):
+        """Called after responses are saved in this process; ignored while a follower feeds the totals"""
+        if self.follower is None:
+            self.apply(docs)
+    
+    def apply(self, docs):
+        """Fold new response documents into the totals and send one delta"""
+        if self._totals is None or not docs:
+            return
+        
+        delta = summarize(docs)
+        with self._condition:
+            if self._totals is None:
+                return
+            _add_totals(self._totals, delta)
+            self._append('delta', {**delta, 'total_responses': self._totals['count']})
+    
+    def reset(self, loader):
+        """Reload after responses were removed; clients receive a new snapshot"""
+        if self._totals is not None:
+            self.ensure_totals(loader, force=True)
+    
+    def stream(self, loader):
+        """
+        SSE byte stream for one client: a snapshot, then shared events and
+        heartbeats. The caller reserves the client slot with try_reserve and
+        releases it when the response is closed.
+        """
+        with self._condition:
+            last_seq = self._seq
+            first = self._frame('snapshot', self._snapshot_payload(), last_seq)
+        
+        yield first
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._seq > last_seq, timeout=self.heartbeat)
+                missed = bool(self._events) and self._events[0][0] > last_seq + 1
+                frames = [frame for seq, frame in self._events if seq > last_seq]
+                last_seq = self._seq
+                if missed:
+                    # Fell behind the buffer; start over from the current totals
+                    frames = [self._frame('snapshot', self._snapshot_payload(), last_seq)]
+            
+            yield b''.join(frames) if frames else b': keep-alive\n\n'
+            self.ensure_totals(loader)
+
+
+class DashboardFollower:
+    """
+    Feeds a DashboardBroadcaster from the repository, for a stream server
+    that does not see the saves itself.
+    
+    Every `interval` seconds, while streams are open, it reads the responses
+    whose ObjectId was generated in the last `lag` seconds and applies the
+    ones it has not seen yet. The window covers ids from several processes
+    arriving slightly out of order. Responses inserted with older ids (spool
+    replays, imports) and deletions are picked up by the broadcaster's
+    periodic resync.
+    """
+    
+    def __init__(self, repository, broadcaster, interval=1.0, lag=5.0):
+        self.repository = repository
+        self.broadcaster = broadcaster
+        self.interval = interval
+        self.lag = lag
+        self._failing = False
+        self._seen = set()
+        self._baseline = None
+        broadcaster.follower = self
+    
+    def poll(self):
+        """Apply responses inserted since the last poll; returns how many were new"""
+        if self.broadcaster.clients == 0 or self.broadcaster.loads == 0:
+            # Nobody is watching; take a fresh baseline when someone is again
+            self._baseline = None
+            return 0
+        
+        loads = self.broadcaster.loads
+        since = ObjectId.from_datetime(datetime.now(timezone.utc) - timedelta(seconds=self.lag))
+        docs = self.repository.find_inserted_since(since)
+        new = [doc for doc in docs if doc['_id'] not in self._seen]
+        self._seen = {doc['_id'] for doc in docs}
+        if self._baseline != loads:
+            # Freshly loaded totals already include what is in the window
+            self._baseline = loads
+            return 0
+        
+        self.broadcaster.apply(new)
+        return len(new)
+    
+    def start(self):
+        thread = threading.Thread(target=self._run, name='dashboard-follower', daemon=True)
+        thread.start()
+        return thread
+    
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.poll()
+                self._failing = False
+            except Exception as e:
+                # Log once per outage rather than every interval
+                if not self._failing:
+                    logger.warning(f"Dashboard follower poll failed, will retry: {e}")
+                self._failing = True
@@ -1,6 +1,12 @@
 from datetime import datetime
 from bson import ObjectId
 from flask import current_app
+from app.admission import track_db_operation
+from app.repositories import empty_statistics
+from app.archive import merge_statistics
+from app import analytics
+from app.schema import EXPENSE_CATEGORIES
+from app.spool import is_unavailable_error
 
 
 class SurveyResponse:
@@ -23,47 +29,193 @@ class SurveyResponse:
         }
     
     def save(self):
-        if current_app.db is None:
-            raise Exception("Database connection not available")
+        doc = self.to_dict()
+        self._id = self._insert_documents([doc], record_latency=True)[0]
+        current_app.dashboard_stream.publish([doc])
+        return self._id
+    
+    @classmethod
+    def save_many(cls, responses):
+        """Insert several responses in one batch"""
+        docs = [response.to_dict() for response in responses]
+        inserted_ids = cls._insert_documents(docs, record_latency=False)
+        current_app.dashboard_stream.publish(docs)
+        return inserted_ids
+    
+    @staticmethod
+    def _insert_documents(docs, record_latency):
+        """
+        Insert into the repository, or into the local write-ahead spool while
+        the database is unavailable, overloaded or times out.
+        """
+        spool = current_app.spool
+        if current_app.repository is None:
+            if spool is None:
+                raise Exception("Database connection not available")
+            return spool.append_many(docs)
+        
+        if spool is not None and current_app.admission.is_overloaded():
+            return spool.append_many(docs)
         
-        result = current_app.db.survey_responses.insert_one(self.to_dict())
-        self._id = result.inserted_id
-        return result
+        try:
+            with track_db_operation(record_latency=record_latency):
+                return current_app.repository.insert_many(docs)
+        except Exception as e:
+            if spool is None or not is_unavailable_error(e):
+                raise
+            current_app.logger.warning(f"Spooling {len(docs)} responses after database error: {str(e)}")
+            return spool.append_many(docs)
+    
+    @classmethod
+    def from_document(cls, doc):
+        return cls(
+            age=doc['age'],
+            gender=doc['gender'],
+            total_income=doc['total_income'],
+            expenses=doc['expenses'],
+            _id=doc['_id'],
+            created_at=doc['created_at']
+        )
     
     @classmethod
     def find_all(cls):
-        if current_app.db is None:
-            return []
+        """All responses from both the hot collection and the Parquet archive"""
+        return [cls.from_document(doc) for doc in cls.find_all_documents()]
+    
+    @classmethod
+    def find_all_documents(cls):
+        """Like find_all, but returns the raw documents for serialization"""
+        docs = []
+        if current_app.repository is not None:
+            with track_db_operation(record_latency=False):
+                docs = current_app.repository.find_all()
+        docs.extend(current_app.archive.find_all())
+        return docs
+    
+    @classmethod
+    def iter_record_batches(cls, columns=None, batch_size=None, **criteria):
+        """
+        Yield responses from both tiers as pyarrow RecordBatches (see
+        app.columnar), without creating a document or object per response.
+        `columns` and the app.columnar `criteria` are applied inside
+        each tier.
+        """
+        if current_app.repository is not None:
+            batches = current_app.repository.iter_record_batches(columns, batch_size, **criteria)
+            while True:
+                with track_db_operation(record_latency=False):
+                    batch = next(batches, None)
+                if batch is None:
+                    break
+                yield batch
         
-        responses = []
-        for doc in current_app.db.survey_responses.find():
-            response = cls(
-                age=doc['age'],
-                gender=doc['gender'],
-                total_income=doc['total_income'],
-                expenses=doc['expenses'],
-                _id=doc['_id'],
-                created_at=doc['created_at']
-            )
-            responses.append(response)
-        return responses
+        yield from current_app.archive.iter_record_batches(columns, batch_size, **criteria)
+    
+    @classmethod
+    def read_table(cls, columns=None, **criteria):
+        """All matching responses from both tiers in one pyarrow Table"""
+        from app import columnar
+        return columnar.read_table(cls.iter_record_batches(columns, **criteria), columns)
     
     @classmethod
     def find_by_id(cls, response_id):
-        if current_app.db is None:
-            return None
+        """A response from the hot tier, or from the archive once it has been moved there"""
+        doc = None
+        if current_app.repository is not None:
+            with track_db_operation():
+                doc = current_app.repository.find_by_id(response_id)
+        if doc is None:
+            doc = current_app.archive.find_by_id(response_id)
+        return cls.from_document(doc) if doc else None
+    
+    @classmethod
+    def delete_all(cls):
+        """Delete every response from both the hot tier and the archive"""
+        if current_app.repository is None:
+            raise Exception("Database connection not available")
+        
+        with track_db_operation(record_latency=False):
+            deleted = current_app.repository.delete_all()
+        deleted += current_app.archive.delete_all()
+        current_app.dashboard_stream.reset(cls.get_totals)
+        return deleted
+    
+    @classmethod
+    def get_statistics(cls):
+        """Dashboard statistics, computed once per collection version across all workers"""
+        stats, _ = current_app.analytics_cache.get_or_compute(
+            ('statistics',), cls.collection_version(), cls._compute_statistics
+        )
+        return stats
+    
+    @classmethod
+    def _compute_statistics(cls):
+        stats = empty_statistics()
+        if current_app.repository is not None:
+            with track_db_operation(record_latency=False):
+                stats = current_app.repository.get_statistics()
+        
+        # Archived partitions carry pre-computed aggregates in the catalog
+        stats = merge_statistics(stats, current_app.archive.summary())
+        stats['avg_age'] = round(stats['avg_age'], 1)
+        stats['avg_income'] = round(stats['avg_income'], 2)
+        return stats
+    
+    @classmethod
+    def get_totals(cls):
+        """Unrounded dashboard aggregates in the app.archive.summarize shape, for live updates"""
+        totals, _ = current_app.analytics_cache.get_or_compute(
+            ('totals',), cls.collection_version(), cls._compute_totals
+        )
+        return totals
+    
+    @classmethod
+    def _compute_totals(cls):
+        stats = empty_statistics()
+        if current_app.repository is not None:
+            with track_db_operation(record_latency=False):
+                stats = current_app.repository.get_statistics()
+        stats = merge_statistics(stats, current_app.archive.summary())
+        
+        count = stats['total_responses']
+        return {
+            'count': count,
+            'age_sum': stats['avg_age'] * count,
+            'income_sum': stats['avg_income'] * count,
+            'gender_counts': dict(stats['gender_distribution']),
+            'expense_sums': {category: stats['expense_totals'].get(category, 0) for category in EXPENSE_CATEGORIES}
+        }
+    
+    @classmethod
+    def collection_version(cls):
+        """Version of the data across both tiers; changes with every write or archive run"""
+        repository_version = current_app.repository.collection_version() if current_app.repository else 0
+        return f'{repository_version}.{current_app.archive.generation()}'
+    
+    @classmethod
+    def crosstab(cls, dimensions, fields, measures):
+        """
+        Grouped count/sum/mean over both tiers, cached per query and collection version.
+        Returns a tuple of (result, cache_hit).
+        """
+        version = cls.collection_version()
+        
+        def compute():
+            groups = []
+            if current_app.repository is not None:
+                with track_db_operation(record_latency=False):
+                    groups = current_app.repository.crosstab(dimensions, fields)
+            groups = analytics.merge_groups(groups, current_app.archive.crosstab(dimensions, fields))
+            return {
+                'dimensions': dimensions,
+                'fields': fields,
+                'measures': measures,
+                'version': version,
+                'rows': analytics.format_rows(groups, dimensions, fields, measures)
+            }
         
-        doc = current_app.db.survey_responses.find_one({'_id': ObjectId(response_id)})
-        if doc:
-            return cls(
-                age=doc['age'],
-                gender=doc['gender'],
-                total_income=doc['total_income'],
-                expenses=doc['expenses'],
-                _id=doc['_id'],
-                created_at=doc['created_at']
-            )
-        return None
+        key = ('crosstab', tuple(dimensions), tuple(fields), tuple(measures))
+        return current_app.analytics_cache.get_or_compute(key, version, compute)
     
     def calculate_total_expenses(self):
         return sum(self.expenses.values())
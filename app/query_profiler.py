@@ -0,0 +1,339 @@
+"""
+Slow-query log and per-query-shape statistics for MongoDB.
+
+QueryProfiler is a pymongo command listener. Every command the client sends
+is reduced to a fingerprint: the command name, the collection and the shape
+of its filter, sort, projection or pipeline with every value replaced by "?".
+Calls, total and maximum latency, slow calls and errors are counted per
+fingerprint. getMore batches are added to the fingerprint of the find or
+aggregate that opened the cursor, so a scan shows up as one access pattern.
+
+Commands slower than the threshold are logged together with a summary of
+their query plan. Running explain from inside a listener would block the
+command that triggered it, so plans are fetched on a background thread, at
+most once per fingerprint per `explain_interval` seconds.
+
+Each process writes its statistics to <stats path>/<token>.json, named by a
+random token, now and then and at exit; data_processing/query_report.py
+merges those files and prints the most expensive fingerprints.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Handshakes, heartbeats and our own explains are not application queries
+IGNORED_COMMANDS = {'hello', 'ismaster', 'ping', 'buildinfo', 'endsessions', 'killcursors',
+                    'explain', 'saslstart', 'saslcontinue', 'authenticate', 'getnonce'}
+
+# Parts of each command that define its shape
+SHAPE_FIELDS = {
+    'find': ('filter', 'sort', 'projection', 'hint'),
+    'aggregate': ('pipeline', 'hint'),
+    'count': ('query', 'hint'),
+    'distinct': ('key', 'query'),
+    'delete': ('deletes',),
+    'update': ('updates',),
+    'findAndModify': ('query', 'sort', 'update', 'remove'),
+    'insert': (),
+}
+
+# Parts of a delete or update statement that define its shape
+STATEMENT_FIELDS = ('q', 'u', 'multi', 'upsert', 'limit')
+
+# Operators whose list holds values rather than sub-expressions
+VALUE_LIST_OPERATORS = {'$in', '$nin', '$all'}
+
+EXPLAINABLE = {'find', 'aggregate', 'count', 'distinct', 'delete', 'update', 'findAndModify'}
+
+# Driver-added fields that must not be passed to explain
+SESSION_FIELDS = {'lsid', '$db', '$clusterTime', 'txnNumber', '$readPreference',
+                  'readConcern', 'writeConcern', 'autocommit', 'startTransaction'}
+
+
+def _distinct(shapes):
+    unique = []
+    for shape in shapes:
+        if shape not in unique:
+            unique.append(shape)
+    return unique
+
+
+def query_shape(value, operator=None):
+    """`value` with every literal replaced by '?', keeping keys and operators"""
+    if isinstance(value, dict):
+        return {key: query_shape(item, key) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = [query_shape(item) for item in value]
+        # Value lists of any length share a shape; pipeline stages and
+        # $or/$and branches keep their order and number
+        return _distinct(shapes) if operator in VALUE_LIST_OPERATORS else shapes
+    return '?'
+
+
+def fingerprint(command_name, command, database):
+    """Fingerprint of a command such as `find survey_responses {"filter": {"age": {"$gte": "?"}}}`"""
+    collection = command.get(command_name)
+    namespace = f"{database}.{collection}" if isinstance(collection, str) else database
+    
+    shape = {}
+    for field in SHAPE_FIELDS.get(command_name, ()):
+        if field not in command:
+            continue
+        if field in ('deletes', 'updates'):
+            # Only the statements' filters, update operators and flags matter;
+            # a bulk write of identical statements has one shape whatever its size
+            shape[field] = _distinct([
+                query_shape({key: statement[key] for key in STATEMENT_FIELDS if key in statement})
+                for statement in command[field]
+            ])
+        elif field == 'key':
+            shape[field] = command[field]
+        else:
+            shape[field] = query_shape(command[field])
+    
+    if not shape:
+        return f"{command_name} {namespace}"
+    return f"{command_name} {namespace} {json.dumps(shape, separators=(',', ':'), default=str)}"
+
+
+def summarize_plan(explain):
+    """One-line winning plan, e.g. 'FETCH > IXSCAN gender_1_overspending_1_age_1'"""
+    def find_planner(node):
+        if isinstance(node, dict):
+            if 'queryPlanner' in node:
+                return node['queryPlanner']
+            children = node.values()
+        elif isinstance(node, list):
+            children = node
+        else:
+            return None
+        for child in children:
+            planner = find_planner(child)
+            if planner is not None:
+                return planner
+        return None
+    
+    planner = find_planner(explain)
+    if planner is None:
+        return 'no plan reported'
+    
+    plan = planner.get('winningPlan', {})
+    # Slot-based engine plans wrap the classic plan tree
+    plan = plan.get('queryPlan', plan)
+    stages = []
+    while plan:
+        stage = plan.get('stage', '?')
+        if plan.get('indexName'):
+            stage += f" {plan['indexName']}"
+        stages.append(stage)
+        plan = plan.get('inputStage') or (plan.get('inputStages') or [None])[0]
+    return ' > '.join(stages) or 'no plan reported'
+
+
+def _new_entry():
+    return {'calls': 0, 'getmores': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'slow': 0, 'errors': 0, 'plan': None}
+
+
+def merge_entries(target, entry):
+    target['calls'] += entry['calls']
+    target['getmores'] += entry['getmores']
+    target['total_ms'] += entry['total_ms']
+    target['max_ms'] = max(target['max_ms'], entry['max_ms'])
+    target['slow'] += entry['slow']
+    target['errors'] += entry['errors']
+    target['plan'] = entry['plan'] or target['plan']
+
+
+class QueryProfiler(monitoring.CommandListener):
+    def __init__(self, stats_path=None, slow_ms=100, explain_interval=300, flush_interval=30):
+        self.stats_path = stats_path
+        self.slow_ms = slow_ms
+        self.explain_interval = explain_interval
+        self.flush_interval = flush_interval
+        self.client = None
+        # Names this process's statistics file; PIDs repeat across container restarts
+        self.token = uuid.uuid4().hex[:12]
+        
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._pending = {}
+        self._cursors = {}
+        self._explained_at = {}
+        self._explain_queue = queue.Queue(maxsize=100)
+        self._started = False
+    
+    def attach(self, client):
+        """Use `client` for explains and start the background threads"""
+        self.client = client
+        if self._started:
+            return
+        self._started = True
+        threading.Thread(target=self._explain_loop, name='query-explain', daemon=True).start()
+        if self.stats_path:
+            threading.Thread(target=self._flush_loop, name='query-stats', daemon=True).start()
+            atexit.register(self.flush)
+    
+    # Listener callbacks, called on the thread running the command
+    
+    def started(self, event):
+        name = event.command_name
+        if name == 'killCursors':
+            with self._lock:
+                for cursor_id in event.command.get('cursors', []):
+                    self._cursors.pop(cursor_id, None)
+        if name.lower() in IGNORED_COMMANDS or not event.command:
+            return
+        
+        cursor_id = None
+        if name == 'getMore':
+            cursor_id = event.command['getMore']
+            with self._lock:
+                origin = self._cursors.get(cursor_id)
+            if origin is None:
+                # Cursor opened before the profiler saw it
+                origin = (fingerprint(name, {name: event.command.get('collection')}, event.database_name), None)
+            key, command = origin
+        else:
+            key = fingerprint(name, event.command, event.database_name)
+            command = event.command if name in EXPLAINABLE else None
+        
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (key, command, event.database_name, cursor_id)
+    
+    def succeeded(self, event):
+        pending = self._finish(event, error=False)
+        if pending is None:
+            return
+        
+        key, command, _, cursor_id = pending
+        cursor = event.reply.get('cursor')
+        if not isinstance(cursor, dict):
+            return
+        with self._lock:
+            if cursor_id is not None and not cursor.get('id'):
+                # The getMore exhausted the cursor
+                self._cursors.pop(cursor_id, None)
+            elif cursor_id is None and cursor.get('id'):
+                self._cursors[cursor['id']] = (key, command)
+    
+    def failed(self, event):
+        pending = self._finish(event, error=True)
+        if pending is not None and pending[3] is not None:
+            with self._lock:
+                self._cursors.pop(pending[3], None)
+    
+    def _finish(self, event, error):
+        elapsed_ms = event.duration_micros / 1000
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+            if pending is None:
+                return None
+            key, command, database, cursor_id = pending
+            
+            entry = self._stats.get(key)
+            if entry is None:
+                entry = self._stats[key] = _new_entry()
+            if cursor_id is not None:
+                entry['getmores'] += 1
+            else:
+                entry['calls'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            entry['errors'] += error
+            slow = elapsed_ms >= self.slow_ms
+            if slow:
+                entry['slow'] += 1
+        
+        if slow:
+            self._report_slow(key, command, database, elapsed_ms)
+        return pending
+    
+    def _report_slow(self, key, command, database, elapsed_ms):
+        now = time.monotonic()
+        with self._lock:
+            due = now - self._explained_at.get(key, -self.explain_interval) >= self.explain_interval
+            if command is not None and self.client is not None and due:
+                self._explained_at[key] = now
+            else:
+                due = False
+            plan = self._stats[key]['plan']
+        
+        if not due:
+            suffix = f"; plan: {plan}" if plan else ''
+            logger.warning(f"Slow MongoDB command ({elapsed_ms:.1f} ms): {key}{suffix}")
+            return
+        try:
+            self._explain_queue.put_nowait((key, command, database, elapsed_ms))
+        except queue.Full:
+            logger.warning(f"Slow MongoDB command ({elapsed_ms:.1f} ms): {key}")
+    
+    # Background work
+    
+    def _explain_loop(self):
+        while True:
+            key, command, database, elapsed_ms = self._explain_queue.get()
+            try:
+                plan = summarize_plan(self.explain(command, database))
+            except Exception as e:
+                plan = f"explain failed: {e}"
+            with self._lock:
+                self._stats[key]['plan'] = plan
+            logger.warning(f"Slow MongoDB command ({elapsed_ms:.1f} ms): {key}; plan: {plan}")
+    
+    def explain(self, command, database):
+        """queryPlanner explain of a previously sent command; does not execute it"""
+        explained = {key: value for key, value in command.items() if key not in SESSION_FIELDS}
+        # Write commands can only be explained one statement at a time
+        for field in ('deletes', 'updates'):
+            if field in explained:
+                explained[field] = explained[field][:1]
+        return self.client[database].command('explain', explained, verbosity='queryPlanner')
+    
+    def get_snapshot(self):
+        with self._lock:
+            return {key: dict(entry) for key, entry in self._stats.items()}
+    
+    def flush(self):
+        """Write this process's statistics to <stats_path>/<token>.json"""
+        if not self.stats_path:
+            return
+        path = os.path.join(self.stats_path, f'{self.token}.json')
+        try:
+            os.makedirs(self.stats_path, exist_ok=True)
+            with open(path + '.tmp', 'w') as f:
+                json.dump({'pid': os.getpid(), 'updated_at': time.time(), 'fingerprints': self.get_snapshot()}, f)
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            logger.warning(f"Could not write query statistics to {path}: {e}")
+    
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+
+def load_statistics(stats_path):
+    """Merge the statistics files written by every process"""
+    merged = {}
+    for name in sorted(os.listdir(stats_path)) if os.path.isdir(stats_path) else []:
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(stats_path, name)) as f:
+                fingerprints = json.load(f)['fingerprints']
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Skipping unreadable query statistics file {name}: {e}")
+            continue
+        for key, entry in fingerprints.items():
+            merge_entries(merged.setdefault(key, _new_entry()), entry)
+    return merged
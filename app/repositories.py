@@ -0,0 +1,575 @@
+"""
+Storage backends for survey responses.
+
+SurveyResponse talks to a SurveyRepository instead of a MongoDB collection
+directly, so small deployments can run on an embedded SQLite database.
+Every backend reads and writes documents in the SurveyResponse.to_dict()
+shape: _id (ObjectId), age, gender, total_income, expenses dict, created_at.
+"""
+
+import itertools
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import pymongo
+from bson import ObjectId
+
+from app import schema
+from app import analytics
+from app.schema import EXPENSE_CATEGORIES
+
+
+def empty_statistics():
+    return {
+        'total_responses': 0,
+        'avg_age': 0,
+        'avg_income': 0,
+        'gender_distribution': {},
+        'expense_totals': {}
+    }
+
+
+class SurveyRepository:
+    """Interface every storage backend implements"""
+    
+    name = None
+    
+    def insert(self, doc):
+        raise NotImplementedError
+    
+    def insert_many(self, docs):
+        raise NotImplementedError
+    
+    def upsert_many(self, docs):
+        """Insert or replace documents by _id, so writing the same documents twice is harmless"""
+        raise NotImplementedError
+    
+    def find_all(self):
+        raise NotImplementedError
+    
+    def find_by_id(self, response_id):
+        raise NotImplementedError
+    
+    def iter_record_batches(self, columns=None, batch_size=None, **criteria):
+        """
+        Yield pyarrow RecordBatches in the app.columnar schema, reading only
+        `columns` and rows matching the app.columnar `criteria`
+        """
+        raise NotImplementedError
+    
+    def delete_all(self):
+        raise NotImplementedError
+    
+    def find_created_before(self, cutoff, limit, after_id=None):
+        """Up to `limit` documents older than `cutoff`, in _id order after `after_id`"""
+        raise NotImplementedError
+    
+    def find_inserted_since(self, since_id):
+        """Documents whose ObjectId is at or after `since_id`, in _id order"""
+        raise NotImplementedError
+    
+    def delete_by_ids(self, ids):
+        raise NotImplementedError
+    
+    def get_statistics(self):
+        """Return the unrounded admin dashboard statistics, computed inside the database"""
+        raise NotImplementedError
+    
+    def crosstab(self, dimensions, fields):
+        """Per-group counts and sums in the app.analytics partial-aggregate shape"""
+        raise NotImplementedError
+    
+    def collection_version(self):
+        """Counter bumped by every write, used to key cached analytics"""
+        raise NotImplementedError
+
+
+class MongoSurveyRepository(SurveyRepository):
+    """
+    MongoDB backend storing documents in the compact schema from app.schema.
+    
+    Documents written before the compact schema are still read and queried,
+    so the collection can be migrated in place.
+    """
+    
+    name = 'mongodb'
+    
+    def __init__(self, db, write_timeout_ms=None):
+        self.db = db
+        self.collection = db.survey_responses
+        self.write_timeout_ms = write_timeout_ms
+    
+    def _write_timeout(self):
+        # Client-side operation timeout keeps a stalled primary from holding the request
+        return pymongo.timeout(self.write_timeout_ms / 1000 if self.write_timeout_ms else None)
+    
+    def bump_version(self):
+        """Invalidate cached analytics; also used by bulk loaders writing to the collection directly"""
+        self.db.collection_versions.update_one(
+            {'_id': self.collection.name}, {'$inc': {'version': 1}}, upsert=True
+        )
+    
+    def insert(self, doc):
+        with self._write_timeout():
+            inserted_id = self.collection.insert_one(schema.encode_document(doc)).inserted_id
+            self.bump_version()
+        return inserted_id
+    
+    def insert_many(self, docs):
+        if not docs:
+            return []
+        with self._write_timeout():
+            inserted_ids = self.collection.insert_many(
+                [schema.encode_document(doc) for doc in docs], ordered=False
+            ).inserted_ids
+            self.bump_version()
+        return inserted_ids
+    
+    def upsert_many(self, docs):
+        if not docs:
+            return 0
+        requests = [
+            pymongo.ReplaceOne({'_id': doc['_id']}, schema.encode_document(doc), upsert=True)
+            for doc in docs
+        ]
+        with self._write_timeout():
+            result = self.collection.bulk_write(requests, ordered=False)
+            self.bump_version()
+        return result.upserted_count + result.matched_count
+    
+    def find_all(self):
+        return [schema.decode_document(doc) for doc in self.collection.find()]
+    
+    def find_by_id(self, response_id):
+        doc = self.collection.find_one({'_id': ObjectId(response_id)})
+        return schema.decode_document(doc) if doc else None
+    
+    def ensure_indexes(self):
+        """
+        Indexes serving filtered reads on current-schema documents.
+        
+        The compound index follows equality-sort-range order for queries such as
+        "overspending women aged 30-40"; the version index keeps the branch for
+        not-yet-migrated documents cheap once the backfill has run.
+        """
+        fields = schema.FIELDS
+        self.collection.create_indexes([
+            pymongo.IndexModel([(fields['gender'], 1), (fields['overspending'], 1), (fields['age'], 1)],
+                               name='gender_overspending_age'),
+            pymongo.IndexModel([(fields['overspending'], 1), (fields['age'], 1)], name='overspending_age'),
+            pymongo.IndexModel([(fields['health_score'], 1), (fields['age'], 1)], name='health_score_age'),
+            pymongo.IndexModel([(fields['total_income'], 1)], name='total_income'),
+            pymongo.IndexModel([(fields['created_at'], 1)], name='created_at'),
+            pymongo.IndexModel([(fields['version'], 1)], name='schema_version')
+        ])
+    
+    def _criteria_filter(self, min_age=None, max_age=None, gender=None,
+                         min_income=None, max_income=None, overspending=None,
+                         min_health_score=None, max_health_score=None):
+        fields = schema.FIELDS
+        
+        # Current documents: plain field predicates served by ensure_indexes()
+        current = {fields['version']: schema.SCHEMA_VERSION}
+        if min_age is not None or max_age is not None:
+            current[fields['age']] = _range(min_age, max_age)
+        if gender is not None:
+            current[fields['gender']] = gender.lower()
+        if min_income is not None or max_income is not None:
+            current[fields['total_income']] = _range(
+                schema.to_cents(min_income) if min_income is not None else None,
+                schema.to_cents(max_income) if max_income is not None else None
+            )
+        if overspending is not None:
+            current[fields['overspending']] = bool(overspending)
+        if min_health_score is not None or max_health_score is not None:
+            current[fields['health_score']] = _range(min_health_score, max_health_score)
+        
+        # Older documents awaiting migration: computed from normalized fields
+        normalized = schema.normalized_fields()
+        total_expenses = {'$add': [normalized[category] for category in EXPENSE_CATEGORIES]}
+        conditions = []
+        for expression, operator, value in [(normalized['age'], '$gte', min_age),
+                                            (normalized['age'], '$lte', max_age),
+                                            (normalized['gender'], '$eq', gender.lower() if gender else None),
+                                            (normalized['total_income'], '$gte', min_income),
+                                            (normalized['total_income'], '$lte', max_income)]:
+            if value is not None:
+                conditions.append({operator: [expression, value]})
+        if overspending is not None:
+            conditions.append({'$gt' if overspending else '$lte': [total_expenses, normalized['total_income']]})
+        if min_health_score is not None or max_health_score is not None:
+            ratio = {'$cond': [{'$gt': [normalized['total_income'], 0]},
+                               {'$multiply': [{'$divide': [total_expenses, normalized['total_income']]}, 100]},
+                               0]}
+            score = {'$switch': {
+                'branches': [{'case': {'$lte': [ratio, limit]}, 'then': score} for limit, score in
+                             [(50, 100), (70, 80), (90, 60), (100, 40)]],
+                'default': 20
+            }}
+            if min_health_score is not None:
+                conditions.append({'$gte': [score, min_health_score]})
+            if max_health_score is not None:
+                conditions.append({'$lte': [score, max_health_score]})
+        older = {fields['version']: {'$ne': schema.SCHEMA_VERSION}}
+        if conditions:
+            older['$expr'] = {'$and': conditions}
+        
+        return {'$or': [current, older]}
+    
+    def iter_record_batches(self, columns=None, batch_size=None, **criteria):
+        from app import columnar
+        
+        target = columnar.select_schema(columns)
+        batch_size = batch_size or columnar.DEFAULT_BATCH_SIZE
+        normalized = schema.normalized_fields()
+        project = {'_id': 0}
+        for field in target:
+            if field.name == 'id':
+                project['id'] = {'$toString': '$_id'}
+            elif field.name in ('age', 'gender', 'created_at'):
+                project[field.name] = normalized[field.name]
+            else:
+                project[field.name] = {'$toDouble': normalized[field.name]}
+        pipeline = [{'$match': self._criteria_filter(**criteria)}, {'$project': project}]
+        
+        if columnar.Schema is not None:
+            yield from columnar.iter_mongo_arrow_batches(self.collection, pipeline, target, batch_size)
+            return
+        
+        cursor = self.collection.aggregate(pipeline, batchSize=batch_size)
+        while True:
+            docs = list(itertools.islice(cursor, batch_size))
+            if not docs:
+                break
+            yield columnar.batch_from_columns(
+                {field.name: [doc.get(field.name) for doc in docs] for field in target}, target
+            )
+    
+    def delete_all(self):
+        deleted = self.collection.delete_many({}).deleted_count
+        self.bump_version()
+        return deleted
+    
+    def find_created_before(self, cutoff, limit, after_id=None):
+        query = {'$or': [
+            {schema.FIELDS['created_at']: {'$lt': cutoff}},
+            {'created_at': {'$lt': cutoff}}
+        ]}
+        if after_id is not None:
+            query['_id'] = {'$gt': after_id}
+        cursor = self.collection.find(query).sort('_id', 1).limit(limit)
+        return [schema.decode_document(doc) for doc in cursor]
+    
+    def find_inserted_since(self, since_id):
+        cursor = self.collection.find({'_id': {'$gte': since_id}}).sort('_id', 1)
+        return [schema.decode_document(doc) for doc in cursor]
+    
+    def delete_by_ids(self, ids):
+        deleted = self.collection.delete_many({'_id': {'$in': list(ids)}}).deleted_count
+        self.bump_version()
+        return deleted
+    
+    def collection_version(self):
+        doc = self.db.collection_versions.find_one({'_id': self.collection.name})
+        return doc['version'] if doc else 0
+    
+    def crosstab(self, dimensions, fields):
+        expressions = analytics.mongo_dimension_expressions()
+        pipeline = [
+            {'$project': schema.normalized_fields()},
+            {'$group': {
+                '_id': {dimension: expressions[dimension] for dimension in dimensions},
+                'count': {'$sum': 1},
+                **{field: {'$sum': f'${field}'} for field in fields}
+            }}
+        ]
+        return [
+            {'key': row['_id'], 'count': row['count'], 'sums': {field: row[field] for field in fields}}
+            for row in self.collection.aggregate(pipeline)
+        ]
+    
+    def get_statistics(self):
+        pipeline = [
+            {'$project': schema.normalized_fields()},
+            {'$facet': {
+                'totals': [{
+                    '$group': {
+                        '_id': None,
+                        'total_responses': {'$sum': 1},
+                        'avg_age': {'$avg': '$age'},
+                        'avg_income': {'$avg': '$total_income'},
+                        **{category: {'$sum': f'${category}'} for category in EXPENSE_CATEGORIES}
+                    }
+                }],
+                'genders': [{'$group': {'_id': '$gender', 'count': {'$sum': 1}}}]
+            }}
+        ]
+        result = next(self.collection.aggregate(pipeline))
+        if not result['totals']:
+            return empty_statistics()
+        
+        totals = result['totals'][0]
+        return {
+            'total_responses': totals['total_responses'],
+            'avg_age': totals['avg_age'],
+            'avg_income': totals['avg_income'],
+            'gender_distribution': {row['_id']: row['count'] for row in result['genders']},
+            'expense_totals': {category: totals[category] for category in EXPENSE_CATEGORIES}
+        }
+
+
+def _range(minimum, maximum):
+    condition = {}
+    if minimum is not None:
+        condition['$gte'] = minimum
+    if maximum is not None:
+        condition['$lte'] = maximum
+    return condition
+
+
+class SQLiteSurveyRepository(SurveyRepository):
+    """
+    Embedded backend for single-host deployments and local development.
+    
+    Runs in WAL mode so dashboard reads do not block submissions, keeps one
+    connection per thread, and stores each expense category as its own column.
+    The derived financial fields are indexed virtual generated columns.
+    """
+    
+    name = 'sqlite'
+    
+    COLUMNS = ['id', 'age', 'gender', 'total_income'] + EXPENSE_CATEGORIES + ['created_at']
+    
+    TOTAL_EXPENSES = ' + '.join(EXPENSE_CATEGORIES)
+    EXPENSE_RATIO = f'CASE WHEN total_income > 0 THEN ({TOTAL_EXPENSES}) * 100.0 / total_income ELSE 0 END'
+    DERIVED_COLUMNS = {
+        'total_expenses': f'REAL GENERATED ALWAYS AS ({TOTAL_EXPENSES}) VIRTUAL',
+        'savings': f'REAL GENERATED ALWAYS AS (total_income - ({TOTAL_EXPENSES})) VIRTUAL',
+        'expense_ratio': f'REAL GENERATED ALWAYS AS ({EXPENSE_RATIO}) VIRTUAL',
+        'health_score': (
+            f'INTEGER GENERATED ALWAYS AS (CASE WHEN {EXPENSE_RATIO} <= 50 THEN 100 '
+            f'WHEN {EXPENSE_RATIO} <= 70 THEN 80 WHEN {EXPENSE_RATIO} <= 90 THEN 60 '
+            f'WHEN {EXPENSE_RATIO} <= 100 THEN 40 ELSE 20 END) VIRTUAL'
+        ),
+        'overspending': f'INTEGER GENERATED ALWAYS AS (({TOTAL_EXPENSES}) > total_income) VIRTUAL'
+    }
+    
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        if path != ':memory:' and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._create_schema()
+    
+    @property
+    def connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+    
+    def _create_schema(self):
+        expense_columns = ', '.join(f'{category} REAL NOT NULL DEFAULT 0' for category in EXPENSE_CATEGORIES)
+        with self.connection as connection:
+            connection.execute(f"""
+                CREATE TABLE IF NOT EXISTS survey_responses (
+                    id TEXT PRIMARY KEY,
+                    age INTEGER NOT NULL,
+                    gender TEXT NOT NULL,
+                    total_income REAL NOT NULL,
+                    {expense_columns},
+                    created_at TEXT NOT NULL
+                )
+            """)
+            for column in ['age', 'gender', 'total_income', 'created_at']:
+                connection.execute(
+                    f'CREATE INDEX IF NOT EXISTS idx_survey_responses_{column} ON survey_responses ({column})'
+                )
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS collection_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)'
+            )
+            
+            # Databases created before the derived columns existed get them added in place
+            existing = {row['name'] for row in connection.execute('PRAGMA table_xinfo(survey_responses)')}
+            for column, definition in self.DERIVED_COLUMNS.items():
+                if column not in existing:
+                    connection.execute(f'ALTER TABLE survey_responses ADD COLUMN {column} {definition}')
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS idx_survey_responses_gender_overspending_age '
+                'ON survey_responses (gender, overspending, age)'
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS idx_survey_responses_health_score_age '
+                'ON survey_responses (health_score, age)'
+            )
+    
+    def _bump_version(self, connection):
+        # Runs inside the writing transaction so readers never see data and version disagree
+        connection.execute(
+            "INSERT INTO collection_versions (name, version) VALUES ('survey_responses', 1) "
+            "ON CONFLICT(name) DO UPDATE SET version = version + 1"
+        )
+    
+    def _to_row(self, doc):
+        expenses = doc.get('expenses') or {}
+        return (
+            str(doc['_id']),
+            int(doc['age']),
+            doc['gender'],
+            float(doc['total_income']),
+            *[float(expenses.get(category, 0)) for category in EXPENSE_CATEGORIES],
+            doc['created_at'].isoformat()
+        )
+    
+    def _to_doc(self, row):
+        return {
+            '_id': ObjectId(row['id']),
+            'age': row['age'],
+            'gender': row['gender'],
+            'total_income': row['total_income'],
+            'expenses': {category: row[category] for category in EXPENSE_CATEGORIES},
+            'created_at': datetime.fromisoformat(row['created_at'])
+        }
+    
+    def insert(self, doc):
+        return self.insert_many([doc])[0]
+    
+    def insert_many(self, docs):
+        placeholders = ', '.join('?' for _ in self.COLUMNS)
+        with self.connection as connection:
+            connection.executemany(
+                f"INSERT INTO survey_responses ({', '.join(self.COLUMNS)}) VALUES ({placeholders})",
+                [self._to_row(doc) for doc in docs]
+            )
+            self._bump_version(connection)
+        return [doc['_id'] for doc in docs]
+    
+    def upsert_many(self, docs):
+        placeholders = ', '.join('?' for _ in self.COLUMNS)
+        with self.connection as connection:
+            connection.executemany(
+                f"INSERT OR REPLACE INTO survey_responses ({', '.join(self.COLUMNS)}) VALUES ({placeholders})",
+                [self._to_row(doc) for doc in docs]
+            )
+            self._bump_version(connection)
+        return len(docs)
+    
+    def find_all(self):
+        rows = self.connection.execute('SELECT * FROM survey_responses ORDER BY created_at')
+        return [self._to_doc(row) for row in rows]
+    
+    def find_by_id(self, response_id):
+        row = self.connection.execute(
+            'SELECT * FROM survey_responses WHERE id = ?', (str(response_id),)
+        ).fetchone()
+        return self._to_doc(row) if row else None
+    
+    def _criteria_where(self, min_age=None, max_age=None, gender=None,
+                        min_income=None, max_income=None, overspending=None,
+                        min_health_score=None, max_health_score=None):
+        conditions, params = [], []
+        for clause, value in [('age >= ?', min_age), ('age <= ?', max_age),
+                              ('gender = ?', gender.lower() if gender else None),
+                              ('total_income >= ?', min_income), ('total_income <= ?', max_income),
+                              ('overspending = ?', int(overspending) if overspending is not None else None),
+                              ('health_score >= ?', min_health_score), ('health_score <= ?', max_health_score)]:
+            if value is not None:
+                conditions.append(clause)
+                params.append(value)
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        return where, params
+    
+    def iter_record_batches(self, columns=None, batch_size=None, **criteria):
+        from app import columnar
+        
+        target = columnar.select_schema(columns)
+        batch_size = batch_size or columnar.DEFAULT_BATCH_SIZE
+        where, params = self._criteria_where(**criteria)
+        # Plain tuples instead of sqlite3.Row, transposed into columns per batch
+        cursor = self.connection.cursor()
+        cursor.row_factory = None
+        cursor.execute(f"SELECT {', '.join(target.names)} FROM survey_responses {where} ORDER BY created_at", params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            values = dict(zip(target.names, zip(*rows)))
+            if 'created_at' in values:
+                values['created_at'] = columnar.timestamps_from_iso(values['created_at'])
+            yield columnar.batch_from_columns(values, target)
+    
+    def delete_all(self):
+        with self.connection as connection:
+            deleted = connection.execute('DELETE FROM survey_responses').rowcount
+            self._bump_version(connection)
+        return deleted
+    
+    def find_created_before(self, cutoff, limit, after_id=None):
+        rows = self.connection.execute(
+            'SELECT * FROM survey_responses WHERE created_at < ? AND id > ? ORDER BY id LIMIT ?',
+            (cutoff.isoformat(), str(after_id or ''), limit)
+        )
+        return [self._to_doc(row) for row in rows]
+    
+    def find_inserted_since(self, since_id):
+        # Hex ObjectIds sort in the same order as the ids themselves
+        rows = self.connection.execute(
+            'SELECT * FROM survey_responses WHERE id >= ? ORDER BY id', (str(since_id),)
+        )
+        return [self._to_doc(row) for row in rows]
+    
+    def delete_by_ids(self, ids):
+        with self.connection as connection:
+            deleted = connection.executemany(
+                'DELETE FROM survey_responses WHERE id = ?', [(str(response_id),) for response_id in ids]
+            ).rowcount
+            self._bump_version(connection)
+        return deleted
+    
+    def collection_version(self):
+        row = self.connection.execute(
+            "SELECT version FROM collection_versions WHERE name = 'survey_responses'"
+        ).fetchone()
+        return row['version'] if row else 0
+    
+    def crosstab(self, dimensions, fields):
+        expressions = analytics.sql_dimension_expressions()
+        select = [f'{expressions[dimension]} AS {dimension}' for dimension in dimensions]
+        select += ['COUNT(*) AS count'] + [f'SUM({field}) AS {field}' for field in fields]
+        group_by = f"GROUP BY {', '.join(dimensions)}" if dimensions else ''
+        rows = self.connection.execute(f"SELECT {', '.join(select)} FROM survey_responses {group_by}")
+        return [
+            {
+                'key': {dimension: row[dimension] for dimension in dimensions},
+                'count': row['count'],
+                'sums': {field: row[field] or 0 for field in fields}
+            }
+            for row in rows if row['count']
+        ]
+    
+    def get_statistics(self):
+        expense_sums = ', '.join(f'SUM({category}) AS {category}' for category in EXPENSE_CATEGORIES)
+        totals = self.connection.execute(
+            f'SELECT COUNT(*) AS total_responses, AVG(age) AS avg_age, AVG(total_income) AS avg_income, '
+            f'{expense_sums} FROM survey_responses'
+        ).fetchone()
+        if not totals['total_responses']:
+            return empty_statistics()
+        
+        genders = self.connection.execute(
+            'SELECT gender, COUNT(*) AS count FROM survey_responses GROUP BY gender'
+        )
+        return {
+            'total_responses': totals['total_responses'],
+            'avg_age': totals['avg_age'],
+            'avg_income': totals['avg_income'],
+            'gender_distribution': {row['gender']: row['count'] for row in genders},
+            'expense_totals': {category: totals[category] for category in EXPENSE_CATEGORIES}
+        }
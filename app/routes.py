@@ -1,6 +1,9 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app, Response, stream_with_context
 from app.forms import SurveyForm
 from app.models import SurveyResponse, User
+from app.caching import render_cached_page, render_cached_form
+from app.admission import shed_when_overloaded
+from app import analytics
 import numpy as np
 
 bp = Blueprint('main', __name__)
@@ -8,11 +11,14 @@ bp = Blueprint('main', __name__)
 
 @bp.route('/')
 def index():
-    return render_template('index.html', title='Healthcare Survey Portal')
+    return render_cached_page('index', 'index.html', title='Healthcare Survey Portal')
 
 
 @bp.route('/survey', methods=['GET', 'POST'])
 def survey():
+    if request.method == 'GET':
+        return render_cached_form('survey', 'survey.html', SurveyForm, title='Healthcare Survey')
+    
     form = SurveyForm()
     
     if form.validate_on_submit():
@@ -24,14 +30,14 @@ def survey():
                 total_income=form.total_income.data,
                 expenses=expenses
             )
-            result = response.save()
+            response_id = response.save()
             
-            if result:
+            if response_id:
                 flash('Survey submitted successfully!', 'success')
                 return redirect(url_for('main.success'))
             else:
                 flash('Error saving survey data. Please try again.', 'error')
-                
+        
         except Exception as e:
             current_app.logger.error(f"Error saving survey: {str(e)}")
             flash('An error occurred while submitting your survey. Please try again.', 'error')
@@ -41,19 +47,15 @@ def survey():
 
 @bp.route('/success')
 def success():
-    return render_template('success.html', title='Survey Completed')
+    return render_cached_page('success', 'success.html', title='Survey Completed')
 
 
 @bp.route('/api/responses')
+@shed_when_overloaded
 def api_responses():
     try:
-        responses = SurveyResponse.find_all()
-        data = []
-        for response in responses:
-            response_dict = response.to_dict()
-            response_dict['_id'] = str(response_dict['_id'])
-            response_dict['created_at'] = response_dict['created_at'].isoformat()
-            data.append(response_dict)
+        # The app's JSON provider serializes ObjectId and datetime values itself
+        data = SurveyResponse.find_all_documents()
         
         return jsonify({
             'success': True,
@@ -70,48 +72,16 @@ def api_responses():
 
 
 @bp.route('/admin/dashboard')
+@shed_when_overloaded
 def admin_dashboard():
     try:
-        responses = SurveyResponse.find_all()
-        
-        total_responses = len(responses)
-        
-        if total_responses == 0:
-            stats = {
-                'total_responses': 0,
-                'avg_age': 0,
-                'avg_income': 0,
-                'gender_distribution': {},
-                'expense_totals': {}
-            }
-        else:
-            avg_age = sum(r.age for r in responses) / total_responses
-            avg_income = sum(r.total_income for r in responses) / total_responses
-            gender_dist = {}
-            for response in responses:
-                gender = response.gender
-                gender_dist[gender] = gender_dist.get(gender, 0) + 1
-            expense_totals = {
-                'utilities': sum(r.expenses.get('utilities', 0) for r in responses),
-                'entertainment': sum(r.expenses.get('entertainment', 0) for r in responses),
-                'school_fees': sum(r.expenses.get('school_fees', 0) for r in responses),
-                'shopping': sum(r.expenses.get('shopping', 0) for r in responses),
-                'healthcare': sum(r.expenses.get('healthcare', 0) for r in responses)
-            }
-            
-            stats = {
-                'total_responses': total_responses,
-                'avg_age': round(avg_age, 1),
-                'avg_income': round(avg_income, 2),
-                'gender_distribution': gender_dist,
-                'expense_totals': expense_totals
-            }
+        stats = SurveyResponse.get_statistics()
         
         return jsonify({
             'success': True,
             'statistics': stats
         })
-        
+    
     except Exception as e:
         current_app.logger.error(f"Error in admin dashboard: {str(e)}")
         return jsonify({
@@ -120,7 +90,83 @@ def admin_dashboard():
         }), 500
 
 
+@bp.route('/admin/dashboard/stream')
+@shed_when_overloaded
+def admin_dashboard_stream():
+    broadcaster = current_app.dashboard_stream
+    # Reserved here rather than when the generator starts, so a burst of
+    # requests cannot get past the cap
+    if not broadcaster.try_reserve():
+        response = jsonify({
+            'success': False,
+            'error': 'Too many open dashboard streams'
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = str(current_app.admission.retry_after)
+        return response
+    
+    try:
+        # Loaded once per worker; later clients start from the in-memory totals
+        broadcaster.ensure_totals(SurveyResponse.get_totals)
+    except Exception as e:
+        broadcaster.release()
+        current_app.logger.error(f"Error starting dashboard stream: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+    
+    response = Response(
+        stream_with_context(broadcaster.stream(SurveyResponse.get_totals)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Runs when the server closes the response, even if the stream never started
+    response.call_on_close(broadcaster.release)
+    return response
+
+
+@bp.route('/api/analytics/crosstab')
+@shed_when_overloaded
+def analytics_crosstab():
+    try:
+        def parse_list(name, allowed, default):
+            # Repeated names (?dimensions=gender,gender) count once, in first-seen order
+            values = list(dict.fromkeys(
+                value.strip() for value in request.args.get(name, default).split(',') if value.strip()
+            ))
+            invalid = [value for value in values if value not in allowed]
+            if invalid:
+                raise ValueError(f"Invalid {name}: {', '.join(invalid)}. Allowed: {', '.join(allowed)}")
+            return values
+        
+        try:
+            dimensions = parse_list('dimensions', analytics.DIMENSIONS, 'age_bucket')
+            fields = parse_list('fields', analytics.FIELDS, ','.join(analytics.FIELDS))
+            measures = parse_list('measures', analytics.MEASURES, ','.join(analytics.MEASURES))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        result, cached = SurveyResponse.crosstab(dimensions, fields, measures)
+        
+        return jsonify({
+            'success': True,
+            'cached': cached,
+            **result
+        })
+    except Exception as e:
+        current_app.logger.error(f"Error in crosstab analytics: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @bp.route('/api/generate-sample-data', methods=['POST'])
+@shed_when_overloaded
 def generate_sample_data():
     try:
         count = request.args.get('count', 150, type=int)
@@ -133,7 +179,7 @@ def generate_sample_data():
             }), 400
         
         if override:
-            current_app.db.survey_responses.delete_many({})
+            SurveyResponse.delete_all()
         
         np.random.seed(42)
         
@@ -154,24 +200,23 @@ def generate_sample_data():
                 'healthcare': float(np.random.exponential(180) + 80)
             }
             
-            response = SurveyResponse(
+            generated_responses.append(SurveyResponse(
                 age=age,
                 gender=gender,
                 total_income=total_income,
                 expenses=expenses
-            )
-            
-            response.save()
-            generated_responses.append(response._id)
+            ))
+        
+        SurveyResponse.save_many(generated_responses)
         
         return jsonify({
             'success': True,
             'message': f'Successfully generated {count} sample survey responses',
             'count': count,
             'override': override,
-            'generated_ids': [str(id) for id in generated_responses]
+            'generated_ids': [response._id for response in generated_responses]
         })
-        
+    
     except Exception as e:
         current_app.logger.error(f"Error generating sample data: {str(e)}")
         return jsonify({
@@ -0,0 +1,134 @@
+"""
+Compact on-disk document schema for survey responses.
+
+Compact documents use single-letter keys, store money as integer cents and
+keep the expenses as an array in EXPENSE_CATEGORIES order. Version 3 also
+stores the derived financial fields so they can be indexed and filtered on
+inside MongoDB:
+
+    {'_id': ObjectId, 'v': 3, 'a': 34, 'g': 'female', 'i': 523000,
+     'e': [15000, 8000, 0, 21000, 12000], 't': datetime,
+     'x': 56000, 's': 467000, 'r': 10.71, 'h': 100, 'o': False}
+
+Version 2 is the same without the derived fields, and version 1 documents are
+the original verbose shape written by SurveyResponse.to_dict(). All versions
+are decoded transparently so a collection can be migrated in place while the
+application keeps running.
+"""
+
+EXPENSE_CATEGORIES = ['utilities', 'entertainment', 'school_fees', 'shopping', 'healthcare']
+
+SCHEMA_VERSION = 3
+COMPACT_VERSIONS = (2, 3)
+
+# Verbose field name -> compact key
+FIELDS = {
+    'version': 'v',
+    'age': 'a',
+    'gender': 'g',
+    'total_income': 'i',
+    'expenses': 'e',
+    'created_at': 't',
+    'total_expenses': 'x',
+    'savings': 's',
+    'expense_ratio': 'r',
+    'health_score': 'h',
+    'overspending': 'o'
+}
+
+
+def to_cents(amount):
+    return int(round(float(amount) * 100))
+
+
+def from_cents(cents):
+    return cents / 100
+
+
+def is_compact(doc):
+    return doc.get(FIELDS['version']) in COMPACT_VERSIONS
+
+
+def health_score(expense_ratio):
+    """Same thresholds as User.get_financial_health_score in data_processing"""
+    if expense_ratio <= 50:
+        return 100
+    elif expense_ratio <= 70:
+        return 80
+    elif expense_ratio <= 90:
+        return 60
+    elif expense_ratio <= 100:
+        return 40
+    else:
+        return 20
+
+
+def financial_fields(income_cents, expense_cents):
+    """Derived financial fields stored with every version 3 document"""
+    total_expenses = sum(expense_cents)
+    expense_ratio = total_expenses / income_cents * 100 if income_cents else 0
+    return {
+        FIELDS['total_expenses']: total_expenses,
+        FIELDS['savings']: income_cents - total_expenses,
+        FIELDS['expense_ratio']: round(expense_ratio, 2),
+        # Scored from the unrounded ratio, like User.get_financial_health_score
+        FIELDS['health_score']: health_score(expense_ratio),
+        FIELDS['overspending']: total_expenses > income_cents
+    }
+
+
+def encode_document(doc):
+    """Convert a verbose response document into the current compact schema"""
+    expenses = doc.get('expenses') or {}
+    income_cents = to_cents(doc['total_income'])
+    expense_cents = [to_cents(expenses.get(category, 0)) for category in EXPENSE_CATEGORIES]
+    return {
+        '_id': doc['_id'],
+        FIELDS['version']: SCHEMA_VERSION,
+        FIELDS['age']: int(doc['age']),
+        FIELDS['gender']: doc['gender'],
+        FIELDS['total_income']: income_cents,
+        FIELDS['expenses']: expense_cents,
+        FIELDS['created_at']: doc['created_at'],
+        **financial_fields(income_cents, expense_cents)
+    }
+
+
+def decode_document(doc):
+    """Return the verbose shape for a document in any schema version"""
+    if not is_compact(doc):
+        return doc
+    
+    return {
+        '_id': doc['_id'],
+        'age': doc[FIELDS['age']],
+        'gender': doc[FIELDS['gender']],
+        'total_income': from_cents(doc[FIELDS['total_income']]),
+        'expenses': {
+            category: from_cents(cents)
+            for category, cents in zip(EXPENSE_CATEGORIES, doc[FIELDS['expenses']])
+        },
+        'created_at': doc[FIELDS['created_at']]
+    }
+
+
+def normalized_fields():
+    """
+    Aggregation expressions reading a field from any schema version.
+    
+    Used in $project/$addFields stages so pipelines keep working while a
+    migration is only part way through.
+    """
+    fields = {
+        'age': {'$ifNull': [f"${FIELDS['age']}", '$age']},
+        'gender': {'$ifNull': [f"${FIELDS['gender']}", '$gender']},
+        'total_income': {'$ifNull': [{'$divide': [f"${FIELDS['total_income']}", 100]}, '$total_income']},
+        'created_at': {'$ifNull': [f"${FIELDS['created_at']}", '$created_at']}
+    }
+    for index, category in enumerate(EXPENSE_CATEGORIES):
+        fields[category] = {'$ifNull': [
+            {'$divide': [{'$arrayElemAt': [f"${FIELDS['expenses']}", index]}, 100]},
+            f'$expenses.{category}',
+            0
+        ]}
+    return fields
@@ -0,0 +1,202 @@
+"""
+Statistics cache shared by every worker process on the host.
+
+Results are stored in a memory-mapped file (on /dev/shm by default) divided
+into fixed-size slots. Each slot is guarded by a seqlock: the writer makes the
+sequence number odd, writes, then makes it even again, and readers retry if
+the number was odd or changed while they were reading. Readers parse the
+JSON payload straight out of the mapping without copying it first.
+
+A query can be stored in one of two slots chosen by its hash. A new result
+replaces the query's own older entry if there is one, else an empty slot,
+else the slot written longest ago, so two queries whose hashes collide do
+not keep evicting each other; evictions of other queries are counted and
+logged. Each slot records the collection version it was computed for, so a
+write anywhere makes the entry miss. On a miss, one worker takes a lock on
+the query's first slot and computes; the others wait for that lock and then
+read the published result instead of running the same query.
+
+The file name carries the format and layout (slot count and size). Workers
+configured differently use separate files rather than resizing one that
+others still have mapped, which would crash them with SIGBUS.
+"""
+
+import fcntl
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'HSSC0002'
+FILE_HEADER = struct.Struct('>8sII')
+# Sequence number, key digest, key and version digest, write time, payload length
+SLOT_HEADER = struct.Struct('>Q16s16sdI4x')
+READ_RETRIES = 1000
+EVICTION_LOG_INTERVAL = 60
+
+
+def _digest(*parts):
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).digest()
+
+
+def _loads(view):
+    if orjson is not None:
+        return orjson.loads(view)
+    return json.loads(bytes(view))
+
+
+def layout_path(path, slots, slot_size):
+    """Cache file for one format and layout, e.g. /dev/shm/cache.HSSC0002.64x262144"""
+    return f"{path}.{MAGIC.decode()}.{slots}x{slot_size}"
+
+
+class SharedResultCache:
+    def __init__(self, path, dumps, namespace='', slots=64, slot_size=256 * 1024):
+        self.path = layout_path(path, slots, slot_size)
+        self.dumps = dumps
+        self.namespace = namespace
+        self.slots = slots
+        self.slot_size = slot_size
+        self.evictions = 0
+        self._evictions_logged_at = 0.0
+        # Threads of this process; fcntl locks only exclude other processes
+        self._compute_locks = [threading.Lock() for _ in range(slots)]
+        self._write_locks = [threading.Lock() for _ in range(slots)]
+        
+        size = FILE_HEADER.size + slots * slot_size
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(self._fd).st_size == 0:
+                    # Only ever grown from empty, never truncated while mapped
+                    os.ftruncate(self._fd, size)
+                    os.pwrite(self._fd, FILE_HEADER.pack(MAGIC, slots, slot_size), 0)
+                header = os.pread(self._fd, FILE_HEADER.size, 0)
+                if len(header) < FILE_HEADER.size or FILE_HEADER.unpack(header) != (MAGIC, slots, slot_size) \
+                        or os.fstat(self._fd).st_size < size:
+                    raise OSError(f"{self.path} is not a cache file with the expected layout")
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self._mmap = mmap.mmap(self._fd, size)
+        except OSError:
+            os.close(self._fd)
+            raise
+        self._view = memoryview(self._mmap)
+    
+    def _slots(self, key):
+        """The two slot indexes `key` may be stored in"""
+        digest = _digest(self.namespace, key)
+        first = int.from_bytes(digest[:8], 'big') % self.slots
+        second = int.from_bytes(digest[8:], 'big') % self.slots
+        return digest, (first, second) if second != first else (first,)
+    
+    def _offset(self, index):
+        return FILE_HEADER.size + index * self.slot_size
+    
+    def _read(self, offset, digest):
+        for _ in range(READ_RETRIES):
+            seq, _, slot_digest, _, length = SLOT_HEADER.unpack_from(self._mmap, offset)
+            if seq % 2:
+                time.sleep(0)
+                continue
+            if slot_digest != digest:
+                return None
+            try:
+                value = _loads(self._view[offset + SLOT_HEADER.size:offset + SLOT_HEADER.size + length])
+            except ValueError:
+                value = None
+            if SLOT_HEADER.unpack_from(self._mmap, offset)[0] == seq:
+                return value
+        # A writer died mid-update; treat as a miss so the slot gets rewritten
+        return None
+    
+    def get(self, key, version):
+        _, indexes = self._slots(key)
+        digest = _digest(self.namespace, key, version)
+        for index in indexes:
+            value = self._read(self._offset(index), digest)
+            if value is not None:
+                return value
+        return None
+    
+    def _choose_slot(self, key_digest, indexes):
+        """This key's own slot, else an empty one, else the one written longest ago"""
+        headers = [(index, SLOT_HEADER.unpack_from(self._mmap, self._offset(index))) for index in indexes]
+        for index, (_, slot_key, _, _, _) in headers:
+            if slot_key == key_digest:
+                return index, False
+        for index, (seq, _, _, _, _) in headers:
+            if seq == 0:
+                return index, False
+        index = min(headers, key=lambda item: item[1][3])[0]
+        return index, True
+    
+    def _publish(self, key_digest, indexes, digest, value):
+        payload = self.dumps(value).encode()
+        if SLOT_HEADER.size + len(payload) > self.slot_size:
+            logger.warning(f"Result of {len(payload)} bytes does not fit a {self.slot_size} byte cache slot")
+            return
+        
+        index, evicting = self._choose_slot(key_digest, indexes)
+        offset = self._offset(index)
+        # Two queries can share a slot, so writers take a per-slot lock after
+        # the compute locks, at byte `slots + index`
+        with self._write_locks[index]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, self.slots + index)
+            try:
+                seq, slot_key = SLOT_HEADER.unpack_from(self._mmap, offset)[:2]
+                evicting = seq != 0 and slot_key != key_digest
+                # Odd while writing; it may already be odd if a previous writer crashed
+                seq += 1 - seq % 2
+                struct.pack_into('>Q', self._mmap, offset, seq)
+                self._mmap[offset + SLOT_HEADER.size:offset + SLOT_HEADER.size + len(payload)] = payload
+                SLOT_HEADER.pack_into(self._mmap, offset, seq, key_digest, digest, time.time(), len(payload))
+                struct.pack_into('>Q', self._mmap, offset, seq + 1)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, self.slots + index)
+        
+        if evicting:
+            self._record_eviction()
+    
+    def _record_eviction(self):
+        self.evictions += 1
+        now = time.monotonic()
+        if now - self._evictions_logged_at >= EVICTION_LOG_INTERVAL:
+            self._evictions_logged_at = now
+            logger.info(f"Shared statistics cache evicted another query's result ({self.evictions} so far "
+                        f"in this worker); raise SHARED_CACHE_SLOTS if this keeps happening")
+    
+    def get_or_compute(self, key, version, compute):
+        """
+        Cached value for `key` at `version`, computing and publishing it once
+        across all workers on a miss. Returns a tuple of (value, cache_hit).
+        """
+        value = self.get(key, version)
+        if value is not None:
+            return value, True
+        
+        key_digest, indexes = self._slots(key)
+        with self._compute_locks[indexes[0]]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, indexes[0])
+            try:
+                # Another worker may have published while we waited for the lock
+                value = self.get(key, version)
+                if value is not None:
+                    return value, True
+                value = compute()
+                self._publish(key_digest, indexes, _digest(self.namespace, key, version), value)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, indexes[0])
+        return value, False
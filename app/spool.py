@@ -0,0 +1,256 @@
+"""
+Durable local write-ahead spool for survey submissions.
+
+When MongoDB is unreachable, timing out or overloaded, submissions are
+appended to a local spool instead of failing, and a background replayer
+drains the spool into the collection once it is healthy again.
+
+Layout of the spool directory:
+
+    <spool>/segment-<time_ns>-<pid>.active   being appended to by one worker,
+                                             which holds an flock on it
+    <spool>/segment-<time_ns>-<pid>.sealed   closed, waiting to be replayed
+    <spool>/replay.lock                      held by the worker replaying
+
+Each record is a 4-byte length, a 4-byte CRC32 and the BSON document. A torn
+record at the end of a segment (power loss mid-write) fails its checksum and
+is ignored; it was never acknowledged to the client.
+
+Appends use group commit: concurrent writers queue their records, one of them
+writes the whole queue and calls fsync once, and all of them return when the
+data is on disk. Replays are bulk upserts keyed by the ObjectId generated at
+submission time, so replaying a segment twice stores each response once.
+"""
+
+import fcntl
+import glob
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+
+import bson
+from pymongo.errors import ConnectionFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct('>II')
+
+
+class SpoolError(Exception):
+    pass
+
+
+def is_unavailable_error(error):
+    """Errors worth spooling for: the database is unreachable or too slow, not rejecting the data"""
+    return isinstance(error, ConnectionFailure) or (isinstance(error, PyMongoError) and error.timeout)
+
+
+def _fsync_directory(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def read_segment(path):
+    """Documents stored in a segment, stopping at a torn or corrupt tail"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    
+    docs = []
+    offset = 0
+    while offset + HEADER.size <= len(data):
+        length, checksum = HEADER.unpack_from(data, offset)
+        payload = data[offset + HEADER.size:offset + HEADER.size + length]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            break
+        docs.append(bson.decode(payload))
+        offset += HEADER.size + length
+    
+    if offset < len(data):
+        logger.warning(f"Ignoring {len(data) - offset} trailing bytes in spool segment {path}")
+    return docs
+
+
+class WriteSpool:
+    def __init__(self, path, group_commit_ms=2):
+        self.path = path
+        self.group_commit = group_commit_ms / 1000
+        os.makedirs(path, exist_ok=True)
+        
+        self._condition = threading.Condition()
+        self._pending = []
+        self._next_seq = 1
+        self._durable_seq = 0
+        self._failures = {}
+        self._flushing = False
+        
+        self._file_lock = threading.Lock()
+        self._file = None
+        self._segment = None
+    
+    def append_many(self, docs):
+        """Durably append documents; returns once they are fsynced to the spool"""
+        frames = []
+        for doc in docs:
+            payload = bson.encode(doc)
+            frames.append(HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        
+        with self._condition:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._pending.append((seq, frames))
+            
+            while True:
+                if seq in self._failures:
+                    raise SpoolError(f"Could not write to spool: {self._failures.pop(seq)}")
+                if self._durable_seq >= seq:
+                    return [doc['_id'] for doc in docs]
+                if self._flushing:
+                    self._condition.wait()
+                    continue
+                self._commit_pending()
+    
+    def _commit_pending(self):
+        # Caller holds the condition; this thread becomes the group leader
+        self._flushing = True
+        self._condition.release()
+        batch = []
+        error = SpoolError("spool write was interrupted")
+        try:
+            # Give concurrent submissions a moment to join this fsync
+            if self.group_commit:
+                time.sleep(self.group_commit)
+            with self._condition:
+                batch, self._pending = self._pending, []
+            self._write(b''.join(frame for _, frames in batch for frame in frames))
+            error = None
+        except Exception as e:
+            error = e
+        finally:
+            # Whatever went wrong, settle the batch and hand over leadership,
+            # or every waiting writer would block forever
+            self._condition.acquire()
+            for seq, _ in batch:
+                if error is not None:
+                    self._failures[seq] = error
+                self._durable_seq = max(self._durable_seq, seq)
+            self._flushing = False
+            self._condition.notify_all()
+    
+    def _write(self, data):
+        with self._file_lock:
+            if self._file is None:
+                name = os.path.join(self.path, f'segment-{time.time_ns()}-{os.getpid()}')
+                # Lock before the segment appears as .active, so it is never reclaimed while in use
+                self._file = open(name + '.new', 'ab')
+                fcntl.flock(self._file, fcntl.LOCK_EX)
+                self._segment = name + '.active'
+                os.replace(name + '.new', self._segment)
+                _fsync_directory(self.path)
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+    
+    def seal(self):
+        """Close this worker's active segment so it can be replayed"""
+        with self._file_lock:
+            if self._file is None:
+                return
+            # Rename while still holding the lock, then release it by closing
+            os.replace(self._segment, self._segment[:-len('.active')] + '.sealed')
+            self._file.close()
+            _fsync_directory(self.path)
+            self._file = None
+            self._segment = None
+    
+    def sealed_segments(self):
+        """
+        Segments ready for replay, oldest first, including those left by dead
+        workers. An active segment whose flock can be taken has no live writer;
+        PIDs are not trusted because a restarted container reuses them.
+        """
+        for active in glob.glob(os.path.join(self.path, 'segment-*.active')):
+            if active == self._segment:
+                continue
+            try:
+                f = open(active, 'rb')
+            except FileNotFoundError:
+                continue
+            with f:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                try:
+                    os.replace(active, active[:-len('.active')] + '.sealed')
+                except FileNotFoundError:
+                    # Sealed by its writer or reclaimed by another worker meanwhile
+                    continue
+        return sorted(glob.glob(os.path.join(self.path, 'segment-*.sealed')))
+    
+    def get_status(self):
+        segments = glob.glob(os.path.join(self.path, 'segment-*'))
+        return {
+            'segments': len(segments),
+            'bytes': sum(os.path.getsize(segment) for segment in segments)
+        }
+
+
+class SpoolReplayer:
+    """
+    Background thread draining sealed spool segments into a repository.
+    
+    Every worker runs one; a file lock makes sure only one of them replays at
+    a time. A segment is deleted only after all of its documents were upserted.
+    """
+    
+    def __init__(self, spool, repository, interval=1.0, batch_size=500):
+        self.spool = spool
+        self.repository = repository
+        self.interval = interval
+        self.batch_size = batch_size
+        self._failing = False
+    
+    def start(self):
+        thread = threading.Thread(target=self._run, name='spool-replayer', daemon=True)
+        thread.start()
+        return thread
+    
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                replayed = self.drain()
+                if replayed or self._failing:
+                    logger.info(f"Replayed {replayed} spooled responses")
+                self._failing = False
+            except Exception as e:
+                # Log once per outage rather than every interval
+                if not self._failing:
+                    logger.warning(f"Spool replay failed, will retry: {e}")
+                self._failing = True
+    
+    def drain(self):
+        """Replay every sealed segment; returns the number of documents written"""
+        self.spool.seal()
+        
+        with open(os.path.join(self.spool.path, 'replay.lock'), 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0
+            
+            replayed = 0
+            for segment in self.spool.sealed_segments():
+                docs = read_segment(segment)
+                for start in range(0, len(docs), self.batch_size):
+                    self.repository.upsert_many(docs[start:start + self.batch_size])
+                os.remove(segment)
+                _fsync_directory(self.spool.path)
+                replayed += len(docs)
+            return replayed
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Archive Job for Healthcare Survey Data
+Moves survey responses older than a configurable age out of the hot
+collection into date-partitioned, compressed Parquet files (see app/archive.py).
+
+Dashboard statistics, exports and the notebook read both tiers, so results
+are unchanged while the hot collection stays small.
+
+Usage: python archive_responses.py [--older-than-days N] [--batch-size N]
+"""
+
+import sys
+import os
+import argparse
+import logging
+from datetime import datetime, timedelta
+
+# Add the parent directory to the path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def finish_pending_partitions(repository, archive):
+    """Complete partitions left pending by an interrupted run"""
+    pending = [entry for entry in archive.partitions(include_pending=True) if entry['status'] == 'pending']
+    for entry in pending:
+        deleted = repository.delete_by_ids(archive.read_ids(entry))
+        logger.info(f"Finished pending partition {entry['file']} ({deleted} hot documents removed)")
+    if pending:
+        archive.mark_committed(pending)
+    return len(pending)
+
+
+def archive_old_responses(repository, archive, older_than_days=365, batch_size=5000):
+    """
+    Move responses created more than `older_than_days` ago into the archive.
+    Returns the number of responses archived.
+    """
+    finish_pending_partitions(repository, archive)
+    
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    logger.info(f"Archiving responses created before {cutoff.isoformat()}")
+    
+    archived = 0
+    last_id = None
+    while True:
+        batch = repository.find_created_before(cutoff, batch_size, after_id=last_id)
+        if not batch:
+            break
+        
+        # Parquet files and catalog first, then the hot copies, then commit
+        entries = archive.write_pending(batch)
+        repository.delete_by_ids([doc['_id'] for doc in batch])
+        archive.mark_committed(entries)
+        
+        archived += len(batch)
+        last_id = batch[-1]['_id']
+        logger.info(f"Archived {archived} responses so far")
+    
+    return archived
+
+
+def print_catalog(archive):
+    """Print formatted catalog summary"""
+    partitions = archive.partitions()
+    
+    print("\n" + "="*60)
+    print("SURVEY RESPONSE ARCHIVE CATALOG")
+    print("="*60)
+    print(f"\nPartitions: {len(partitions)}")
+    print(f"Archived Responses: {sum(partition['rows'] for partition in partitions):,}")
+    
+    if partitions:
+        dates = [partition['date'] for partition in partitions]
+        print(f"Date Range: {min(dates)} - {max(dates)}")
+    print("\n" + "="*60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Archive old survey responses to Parquet')
+    parser.add_argument('--older-than-days', type=int,
+                        default=int(os.environ.get('ARCHIVE_AFTER_DAYS', 365)),
+                        help='archive responses created more than this many days ago')
+    parser.add_argument('--batch-size', type=int, default=5000, help='responses moved per batch')
+    args = parser.parse_args()
+    
+    app = create_app()
+    if app.repository is None:
+        print("\n❌ Database is not available.")
+        sys.exit(1)
+    
+    archived = archive_old_responses(app.repository, app.archive,
+                                     older_than_days=args.older_than_days,
+                                     batch_size=args.batch_size)
+    print(f"\n✅ Archived {archived} responses to {app.config['ARCHIVE_PATH']}")
+    print_catalog(app.archive)
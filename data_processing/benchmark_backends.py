@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Storage Backend Benchmark for Healthcare Survey Data
+Loads the same synthetic responses into each SurveyRepository and times the
+operations the app depends on:
+
+    insert_many         bulk load in batches
+    upsert_many         rewriting the same documents
+    filtered_scan       a columnar read with an indexed filter ("women aged
+                        30-40 spending over half their income", ~0.7% of rows)
+    get_statistics      the admin dashboard totals
+    crosstab            gender x income band sums
+    iter_record_batches a full columnar scan
+
+SQLite runs on a temporary file. MongoDB runs against --mongo-uri in a
+throwaway database and is skipped when no server answers.
+
+Usage: python benchmark_backends.py [--rows N] [--repeat N] [--mongo-uri URI]
+"""
+
+import sys
+import os
+import argparse
+import tempfile
+import time
+import uuid
+
+# Add the parent directory to the path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pymongo
+from app.repositories import MongoSurveyRepository, SQLiteSurveyRepository
+from data_processing.synthetic import build_documents
+
+# Health score 80 or lower means expenses above half of income
+CRITERIA = {'gender': 'female', 'min_age': 30, 'max_age': 40, 'max_health_score': 80}
+
+
+def best_of(repeat, operation):
+    """Fastest wall time of `operation` over `repeat` runs, with its last result"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = operation()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def benchmark_repository(repository, docs, repeat=3, batch_size=5000):
+    results = {}
+    
+    started = time.perf_counter()
+    for start in range(0, len(docs), batch_size):
+        repository.insert_many(docs[start:start + batch_size])
+    results['insert_many'] = time.perf_counter() - started
+    
+    results['upsert_many'], _ = best_of(1, lambda: repository.upsert_many(docs))
+    results['filtered_scan'], matched = best_of(
+        repeat, lambda: sum(batch.num_rows for batch in repository.iter_record_batches(**CRITERIA))
+    )
+    results['get_statistics'], _ = best_of(repeat, repository.get_statistics)
+    results['crosstab'], _ = best_of(
+        repeat, lambda: repository.crosstab(['gender', 'income_band'], ['total_income', 'healthcare'])
+    )
+    results['iter_record_batches'], scanned = best_of(
+        repeat, lambda: sum(batch.num_rows for batch in repository.iter_record_batches())
+    )
+    results['matched'] = matched
+    results['scanned'] = scanned
+    return results
+
+
+def connect_mongo(uri):
+    """Client for `uri`, or None when no server answers"""
+    client = pymongo.MongoClient(uri, serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command('ping')
+    except pymongo.errors.PyMongoError as e:
+        print(f"Skipping MongoDB: no server at {uri} ({e.__class__.__name__})")
+        client.close()
+        return None
+    return client
+
+
+def run_benchmark(rows=100000, repeat=3, mongo_uri='mongodb://localhost:27017'):
+    docs = build_documents(rows)
+    results = {}
+    
+    with tempfile.TemporaryDirectory(prefix='benchmark_backends_') as directory:
+        repository = SQLiteSurveyRepository(os.path.join(directory, 'survey.db'))
+        results['sqlite'] = benchmark_repository(repository, docs, repeat)
+        repository.connection.close()
+    
+    client = connect_mongo(mongo_uri) if mongo_uri else None
+    if client is not None:
+        db = client[f'benchmark_{uuid.uuid4().hex[:8]}']
+        try:
+            repository = MongoSurveyRepository(db)
+            repository.ensure_indexes()
+            results['mongodb'] = benchmark_repository(repository, docs, repeat)
+        finally:
+            client.drop_database(db.name)
+            client.close()
+    
+    return rows, results
+
+
+def print_report(rows, results):
+    """Print formatted benchmark results"""
+    backends = list(results)
+    operations = ['insert_many', 'upsert_many', 'filtered_scan', 'get_statistics',
+                  'crosstab', 'iter_record_batches']
+    
+    print("\n" + "="*60)
+    print("STORAGE BACKEND BENCHMARK")
+    print("="*60)
+    print(f"\nRows: {rows:,}")
+    print(f"\n  {'Operation':<22}" + ''.join(f"{backend:>14}" for backend in backends))
+    for operation in operations:
+        print(f"  {operation:<22}" + ''.join(f"{results[backend][operation] * 1000:>11,.1f} ms"
+                                            for backend in backends))
+    print(f"\n  {'Rows matched':<22}" + ''.join(f"{results[backend]['matched']:>14,}" for backend in backends))
+    print(f"  {'Rows scanned':<22}" + ''.join(f"{results[backend]['scanned']:>14,}" for backend in backends))
+    print("\n" + "="*60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the SQLite and MongoDB survey repositories')
+    parser.add_argument('--rows', type=int, default=100000, help='response documents to load')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per read; the fastest is reported')
+    parser.add_argument('--mongo-uri', default=os.environ.get('MONGO_URI', 'mongodb://localhost:27017'),
+                        help="MongoDB server to use; pass '' to skip MongoDB")
+    args = parser.parse_args()
+    
+    print_report(*run_benchmark(rows=args.rows, repeat=args.repeat, mongo_uri=args.mongo_uri))
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+JSON Serialization Benchmark for Healthcare Survey API
+Compares the /api/responses serialization path before and after the fast
+JSON provider (see app/json_provider.py) on synthetic response documents:
+
+    legacy:   SurveyResponse objects -> per-row dict copy with str(_id) and
+              created_at.isoformat() -> Flask's stdlib JSON provider
+    provider: repository documents -> FastJSONProvider (orjson if installed)
+
+No database is needed; documents are generated in memory.
+
+Usage: python benchmark_json.py [--rows N] [--repeat N]
+"""
+
+import sys
+import os
+import argparse
+import time
+
+# Add the parent directory to the path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
+from app.models import SurveyResponse
+from app.json_provider import FastJSONProvider
+from data_processing.synthetic import build_documents
+
+
+def legacy_response(docs):
+    """The original api_responses body"""
+    responses = [SurveyResponse.from_document(doc) for doc in docs]
+    data = []
+    for response in responses:
+        response_dict = response.to_dict()
+        response_dict['_id'] = str(response_dict['_id'])
+        response_dict['created_at'] = response_dict['created_at'].isoformat()
+        data.append(response_dict)
+    return jsonify({'success': True, 'count': len(data), 'data': data})
+
+
+def provider_response(docs):
+    return jsonify({'success': True, 'count': len(docs), 'data': docs})
+
+
+def time_path(app, build_response, docs, repeat):
+    """Best wall time over `repeat` runs and the response size"""
+    timings = []
+    with app.app_context():
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = build_response(docs)
+            body = response.get_data()
+            timings.append(time.perf_counter() - started)
+    return min(timings), len(body), body
+
+
+def run_benchmark(rows=50000, repeat=5):
+    docs = build_documents(rows)
+    
+    legacy_app = Flask(__name__)
+    legacy_app.json = DefaultJSONProvider(legacy_app)
+    fast_app = Flask(__name__)
+    fast_app.json = FastJSONProvider(fast_app)
+    
+    legacy_seconds, legacy_size, legacy_body = time_path(legacy_app, legacy_response, docs, repeat)
+    fast_seconds, fast_size, fast_body = time_path(fast_app, provider_response, docs, repeat)
+    
+    return {
+        'rows': rows,
+        'engine': fast_app.json.engine,
+        'legacy_ms': legacy_seconds * 1000,
+        'provider_ms': fast_seconds * 1000,
+        'legacy_bytes': legacy_size,
+        'provider_bytes': fast_size,
+        'same_content': legacy_app.json.loads(legacy_body) == fast_app.json.loads(fast_body)
+    }
+
+
+def print_report(results):
+    """Print formatted benchmark results"""
+    print("\n" + "="*60)
+    print("JSON SERIALIZATION BENCHMARK (/api/responses)")
+    print("="*60)
+    print(f"\nRows: {results['rows']:,}")
+    print(f"Provider Engine: {results['engine']}")
+    print(f"\n  Legacy (dict copy + stdlib json): {results['legacy_ms']:,.1f} ms ({results['legacy_bytes']:,} bytes)")
+    print(f"  Fast JSON provider:               {results['provider_ms']:,.1f} ms ({results['provider_bytes']:,} bytes)")
+    print(f"  Speedup: {results['legacy_ms'] / max(results['provider_ms'], 1e-9):.1f}x")
+    print(f"  Identical payload: {'yes' if results['same_content'] else 'NO'}")
+    print("\n" + "="*60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark JSON serialization of survey responses')
+    parser.add_argument('--rows', type=int, default=50000, help='response documents to serialize')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per path; the fastest is reported')
+    args = parser.parse_args()
+    
+    print_report(run_benchmark(rows=args.rows, repeat=args.repeat))
@@ -6,6 +6,7 @@ This script demonstrates the data processing workflow as required by the assignm
 
 import sys
 import os
+import argparse
 import logging
 from datetime import datetime
 
@@ -21,10 +22,14 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 
-def export_survey_data_to_csv(output_file='./exports/survey_data.csv'):
+def export_survey_data_to_csv(output_file='./exports/survey_data.csv', chunk_size=None):
     """
     Main function to export survey data to CSV
     This demonstrates the complete workflow as required by the assignment
+    
+    Responses are read as columnar batches (see app/columnar.py) instead of
+    one document at a time. With `chunk_size`, the batches are processed out
+    of core, so the export works for datasets larger than memory.
     """
     
     # Create Flask app context
@@ -36,58 +41,48 @@ def export_survey_data_to_csv(output_file='./exports/survey_data.csv'):
             
             # Step 1: Fetch all survey responses from MongoDB
             logger.info("Fetching survey responses from MongoDB...")
-            survey_responses = SurveyResponse.find_all()
-            
-            if not survey_responses:
-                logger.warning("No survey responses found in database")
-                return False
-            
-            logger.info(f"Found {len(survey_responses)} survey responses")
-            
-            # Step 2: Create User data processor
-            processor = UserDataProcessor()
-            
-            # Step 3: Loop through collected data and create User objects
-            logger.info("Processing survey responses...")
-            successful_processed = 0
-            
-            for response in survey_responses:
-                try:
-                    # Create User object from survey response
-                    user = User(
-                        age=response.age,
-                        gender=response.gender,
-                        total_income=response.total_income,
-                        expenses=response.expenses,
-                        user_id=str(response._id),
-                        created_at=response.created_at
-                    )
-                    
-                    processor.add_user(user)
-                    successful_processed += 1
-                    
-                except Exception as e:
-                    logger.error(f"Error processing response {response._id}: {e}")
-                    continue
-            
-            logger.info(f"Successfully processed {successful_processed} users")
-            
-            # Step 4: Export to CSV file
-            logger.info(f"Exporting data to CSV file: {output_file}")
-            success = processor.export_to_csv(output_file)
+            if chunk_size:
+                survey_responses = SurveyResponse.iter_record_batches(batch_size=chunk_size)
+            else:
+                survey_responses = SurveyResponse.read_table()
+                
+                if not survey_responses.num_rows:
+                    logger.warning("No survey responses found in database")
+                    return False
+                
+                logger.info(f"Found {survey_responses.num_rows} survey responses")
             
-            if success:
-                logger.info("CSV export completed successfully!")
+            # Step 2: Create User data processor; closing it removes any spilled partitions
+            with UserDataProcessor(chunk_size=chunk_size) as processor:
                 
-                # Step 5: Generate statistics
-                stats = processor.get_statistics()
-                print_statistics(stats)
+                # Step 3: Create User objects, validating all responses in one batch
+                logger.info("Processing survey responses...")
+                report = processor.add_users_from_arrow(survey_responses)
                 
-                return True
-            else:
-                logger.error("CSV export failed")
-                return False
+                for reject in report['rejects']:
+                    logger.debug(f"Rejected response {reject['index']}: {reject['reason']}")
                 
+                logger.info(f"Successfully processed {report['accepted']} users")
+                if not report['accepted'] and not report['rejects']:
+                    logger.warning("No survey responses found in database")
+                    return False
+                
+                # Step 4: Export to CSV file
+                logger.info(f"Exporting data to CSV file: {output_file}")
+                success = processor.export_to_csv(output_file)
+                
+                if success:
+                    logger.info("CSV export completed successfully!")
+                    
+                    # Step 5: Generate statistics
+                    stats = processor.get_statistics()
+                    print_statistics(stats)
+                    
+                    return True
+                else:
+                    logger.error("CSV export failed")
+                    return False
+        
         except Exception as e:
             logger.error(f"Error in export process: {e}")
             return False
@@ -135,40 +130,23 @@ def export_filtered_data():
     
     with app.app_context():
         try:
-            # Get all responses
-            responses = SurveyResponse.find_all()
-            processor = UserDataProcessor()
-            processor.add_users_from_data(responses)
-            
-            # Export different filtered datasets
-            
-            # 1. High income users (>$5000)
-            high_income_users = processor.get_users_by_criteria(min_income=5000)
-            if high_income_users:
-                high_income_processor = UserDataProcessor()
-                for user in high_income_users:
-                    high_income_processor.add_user(user)
-                high_income_processor.export_to_csv('./exports/high_income_users.csv')
-                logger.info(f"Exported {len(high_income_users)} high income users")
-            
-            # 2. Young adults (18-30)
-            young_adults = processor.get_users_by_criteria(min_age=18, max_age=30)
-            if young_adults:
-                young_processor = UserDataProcessor()
-                for user in young_adults:
-                    young_processor.add_user(user)
-                young_processor.export_to_csv('./exports/young_adults.csv')
-                logger.info(f"Exported {len(young_adults)} young adult users")
-            
-            # 3. Users overspending
-            overspending_users = processor.get_users_by_criteria(overspending=True)
-            if overspending_users:
-                overspending_processor = UserDataProcessor()
-                for user in overspending_users:
-                    overspending_processor.add_user(user)
-                overspending_processor.export_to_csv('./exports/overspending_users.csv')
-                logger.info(f"Exported {len(overspending_users)} overspending users")
+            # Each dataset is filtered inside the database rather than in Python
+            filtered_exports = [
+                ('high income', './exports/high_income_users.csv', {'min_income': 5000}),
+                ('young adult', './exports/young_adults.csv', {'min_age': 18, 'max_age': 30}),
+                ('overspending', './exports/overspending_users.csv', {'overspending': True})
+            ]
             
+            for label, file_path, criteria in filtered_exports:
+                responses = SurveyResponse.read_table(**criteria)
+                if not responses.num_rows:
+                    continue
+                
+                with UserDataProcessor() as filtered_processor:
+                    filtered_processor.add_users_from_arrow(responses)
+                    filtered_processor.export_to_csv(file_path)
+                    logger.info(f"Exported {len(filtered_processor)} {label} users")
+        
         except Exception as e:
             logger.error(f"Error in filtered export: {e}")
 
@@ -204,7 +182,7 @@ def validate_csv_output(csv_file='./exports/survey_data.csv'):
         print(df.head(3).to_string())
         
         return True
-        
+    
     except Exception as e:
         logger.error(f"Error validating CSV: {e}")
         return False
@@ -213,13 +191,16 @@ def validate_csv_output(csv_file='./exports/survey_data.csv'):
 if __name__ == "__main__":
     """
     Command-line interface for CSV export
-    Usage: python export_to_csv.py [output_file]
+    Usage: python export_to_csv.py [output_file] [--chunk-size N]
     """
     
     # Check command line arguments
-    output_file = './exports/survey_data.csv'
-    if len(sys.argv) > 1:
-        output_file = sys.argv[1]
+    parser = argparse.ArgumentParser(description='Export survey responses to CSV')
+    parser.add_argument('output_file', nargs='?', default='./exports/survey_data.csv')
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help='process responses out of core in chunks of this size')
+    args = parser.parse_args()
+    output_file = args.output_file
     
     # Create exports directory
     os.makedirs('./exports', exist_ok=True)
@@ -228,7 +209,7 @@ if __name__ == "__main__":
     print("=" * 40)
     
     # Run main export
-    success = export_survey_data_to_csv(output_file)
+    success = export_survey_data_to_csv(output_file, chunk_size=args.chunk_size)
     
     if success:
         print(f"\n✅ Data successfully exported to: {output_file}")
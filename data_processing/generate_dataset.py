@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Synthetic Dataset Factory for Healthcare Survey Data
+Generates survey responses at production scale with the same distributions as
+the /api/generate-sample-data endpoint, for load and scale testing.
+
+Work is split into shards processed in parallel. Every shard draws from its
+own seeded random stream (numpy SeedSequence.spawn), so a given --seed and
+--shards always produce the same data regardless of --processes.
+
+Usage:
+    python generate_dataset.py --rows 10000000 --target mongo
+    python generate_dataset.py --rows 10000000 --target ndjson --output-dir ./exports/dataset
+    mongoimport --db healthcare_survey --collection survey_responses --file shard-0000.ndjson
+
+Documents get the same _ids on every run with the same options, so rerunning
+into MongoDB skips the rows that are already there; pass --drop to replace
+the collection instead.
+"""
+
+import sys
+import os
+import argparse
+import logging
+import time
+import struct
+import hashlib
+from datetime import datetime, timedelta, timezone
+from multiprocessing import Pool
+
+# Add the parent directory to the path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import bson
+from bson import ObjectId, json_util
+from bson.json_util import JSONOptions, JSONMode
+from app.schema import FIELDS, SCHEMA_VERSION, financial_fields
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+GENDERS = np.array(['male', 'female', 'other'])
+GENDER_PROBABILITIES = [0.45, 0.50, 0.05]
+NDJSON_OPTIONS = JSONOptions(json_mode=JSONMode.RELAXED)
+EPOCH = datetime(1970, 1, 1)
+
+
+def generate_columns(rng, count):
+    """Draw `count` responses as column arrays, amounts in integer cents"""
+    age = np.clip(rng.normal(35, 12, count).astype(np.int64), 18, 70)
+    gender = rng.choice(GENDERS, size=count, p=GENDER_PROBABILITIES)
+    income = rng.exponential(3000, count) + 2000
+    expenses = np.column_stack([
+        rng.exponential(150, count) + 50,                             # utilities
+        rng.exponential(200, count) + 30,                             # entertainment
+        rng.exponential(300, count) * rng.binomial(1, 0.3, count),    # school_fees
+        rng.exponential(250, count) + 100,                            # shopping
+        rng.exponential(180, count) + 80                              # healthcare
+    ])
+    return {
+        'age': age,
+        'gender': gender,
+        'income_cents': np.rint(income * 100).astype(np.int64),
+        'expense_cents': np.rint(expenses * 100).astype(np.int64)
+    }
+
+
+def id_prefix(seed, shard):
+    """4 bytes identifying the (seed, shard) stream in generated ObjectIds"""
+    return hashlib.blake2b(f'{seed}:{shard}'.encode(), digest_size=4).digest()
+
+
+def build_documents(columns, created_at, shard, seed, first_index):
+    """
+    Compact-schema documents (see app/schema.py) from generated columns.
+    
+    ObjectIds are derived from the creation time, a hash of the seed and
+    shard, and the row number instead of being random, so reruns produce
+    identical documents and _id order follows created_at like it does for
+    live submissions.
+    """
+    prefix = id_prefix(seed, shard)
+    ages = columns['age'].tolist()
+    genders = columns['gender'].tolist()
+    incomes = columns['income_cents'].tolist()
+    expenses = columns['expense_cents'].tolist()
+    return [
+        {
+            '_id': ObjectId(struct.pack('>I4sI', int((created_at[i] - EPOCH).total_seconds()), prefix,
+                                        first_index + i)),
+            FIELDS['version']: SCHEMA_VERSION,
+            FIELDS['age']: ages[i],
+            FIELDS['gender']: genders[i],
+            FIELDS['total_income']: incomes[i],
+            FIELDS['expenses']: expenses[i],
+            FIELDS['created_at']: created_at[i],
+            **financial_fields(incomes[i], expenses[i])
+        }
+        for i in range(len(ages))
+    ]
+
+
+def insert_documents(collection, docs):
+    """
+    Unordered bulk insert that skips documents already in the collection.
+    Returns the number of documents inserted.
+    """
+    from pymongo.errors import BulkWriteError
+    try:
+        return len(collection.insert_many(docs, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        # 11000 is a duplicate _id from an earlier run; anything else is a real failure
+        if any(error['code'] != 11000 for error in e.details['writeErrors']) or e.details.get('writeConcernErrors'):
+            raise
+        return e.details['nInserted']
+
+
+def generate_shard(task):
+    """Generate and write one shard; runs in a worker process"""
+    shard, rows, seed_sequence, options = task
+    rng = np.random.default_rng(seed_sequence)
+    started = time.perf_counter()
+    
+    collection = None
+    output = None
+    if options['target'] == 'mongo':
+        from pymongo import MongoClient
+        collection = MongoClient(options['mongo_uri']).healthcare_survey.survey_responses
+    else:
+        extension = 'ndjson' if options['target'] == 'ndjson' else 'bson'
+        path = os.path.join(options['output_dir'], f'shard-{shard:04d}.{extension}')
+        output = open(path, 'w' if extension == 'ndjson' else 'wb')
+    
+    try:
+        written = 0
+        inserted = 0
+        while written < rows:
+            count = min(options['batch_size'], rows - written)
+            columns = generate_columns(rng, count)
+            
+            # Spread creation times uniformly over the window ending at end_date
+            offsets = rng.uniform(0, options['spread_days'] * 86400, count) if options['spread_days'] else np.zeros(count)
+            created_at = [options['end_date'] - timedelta(seconds=int(offset)) for offset in offsets]
+            
+            docs = build_documents(columns, created_at, shard, options['seed'], written)
+            if collection is not None:
+                inserted += insert_documents(collection, docs)
+            elif options['target'] == 'ndjson':
+                output.write('\n'.join(json_util.dumps(doc, json_options=NDJSON_OPTIONS) for doc in docs) + '\n')
+            else:
+                output.write(b''.join(bson.encode(doc) for doc in docs))
+            written += count
+    finally:
+        if output is not None:
+            output.close()
+    
+    skipped = written - inserted if collection is not None else 0
+    return shard, written, skipped, time.perf_counter() - started
+
+
+def generate_dataset(rows, shards, processes, seed, target, output_dir=None,
+                     mongo_uri=None, batch_size=10000, spread_days=0, end_date=None, drop=False):
+    """
+    Generate `rows` responses split over `shards` seeded streams.
+    With `drop`, the MongoDB collection is emptied first.
+    Returns (rows written, elapsed seconds).
+    """
+    if target != 'mongo':
+        os.makedirs(output_dir, exist_ok=True)
+    elif drop:
+        from pymongo import MongoClient
+        from app.repositories import MongoSurveyRepository
+        repository = MongoSurveyRepository(MongoClient(mongo_uri).healthcare_survey)
+        repository.collection.drop()
+        repository.ensure_indexes()
+        logger.info("Dropped the survey_responses collection")
+    
+    options = {
+        'target': target,
+        'output_dir': output_dir,
+        'mongo_uri': mongo_uri,
+        'batch_size': batch_size,
+        'spread_days': spread_days,
+        'seed': seed,
+        # Naive UTC like the rest of the app; defaults to today's midnight for reproducibility
+        'end_date': end_date or datetime.now(timezone.utc).replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+    }
+    seed_sequences = np.random.SeedSequence(seed).spawn(shards)
+    shard_rows = [rows // shards + (1 if shard < rows % shards else 0) for shard in range(shards)]
+    tasks = [(shard, shard_rows[shard], seed_sequences[shard], options) for shard in range(shards)]
+    
+    started = time.perf_counter()
+    total = 0
+    with Pool(processes) as pool:
+        for shard, written, skipped, seconds in pool.imap_unordered(generate_shard, tasks):
+            total += written
+            logger.info(f"Shard {shard}: {written:,} rows in {seconds:.1f}s ({written / max(seconds, 1e-9):,.0f} rows/s)")
+            if skipped:
+                logger.info(f"Shard {shard}: {skipped:,} rows were already in the collection (use --drop to replace them)")
+    elapsed = time.perf_counter() - started
+    
+    if target == 'mongo':
+        # Bulk loads bypass the repository, so invalidate cached analytics explicitly
+        from pymongo import MongoClient
+        from app.repositories import MongoSurveyRepository
+        MongoSurveyRepository(MongoClient(mongo_uri).healthcare_survey).bump_version()
+    
+    return total, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate a synthetic survey dataset for scale testing')
+    parser.add_argument('--rows', type=int, required=True, help='total responses to generate')
+    parser.add_argument('--target', choices=['mongo', 'ndjson', 'bson'], default='ndjson',
+                        help='write to MongoDB directly, or to NDJSON (mongoimport) / BSON (mongorestore) files')
+    parser.add_argument('--output-dir', default='./exports/dataset', help='directory for ndjson/bson shard files')
+    parser.add_argument('--shards', type=int, default=os.cpu_count() or 1, help='independent seeded streams')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='worker processes')
+    parser.add_argument('--seed', type=int, default=42, help='root seed for reproducible output')
+    parser.add_argument('--batch-size', type=int, default=10000, help='documents generated and written per batch')
+    parser.add_argument('--spread-days', type=int, default=0,
+                        help='spread created_at uniformly over this many days before --end-date')
+    parser.add_argument('--end-date', type=datetime.fromisoformat, default=None,
+                        help='latest created_at as YYYY-MM-DD (default: today 00:00 UTC)')
+    parser.add_argument('--drop', action='store_true',
+                        help='drop the MongoDB collection first instead of skipping rows from an earlier run')
+    args = parser.parse_args()
+    
+    mongo_uri = os.environ.get('MONGO_URI', 'mongodb://mongodb:27017/healthcare_survey')
+    
+    print("Healthcare Survey Synthetic Dataset Factory")
+    print("=" * 40)
+    
+    total, elapsed = generate_dataset(
+        rows=args.rows, shards=args.shards, processes=args.processes, seed=args.seed,
+        target=args.target, output_dir=args.output_dir, mongo_uri=mongo_uri,
+        batch_size=args.batch_size, spread_days=args.spread_days, end_date=args.end_date,
+        drop=args.drop
+    )
+    
+    print(f"\n✅ Generated {total:,} responses in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)")
+    if args.target != 'mongo':
+        print(f"Shard files written to: {args.output_dir}")
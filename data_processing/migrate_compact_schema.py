@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Compact Schema Migration for Healthcare Survey Data
+Rewrites survey documents from any older schema version into the current
+compact schema (see app/schema.py) in batches, and reports the storage saved
+according to collStats. This also backfills the derived financial fields
+(total expenses, savings, expense ratio, health score, overspending flag)
+introduced in schema version 3.
+
+The migration is resumable: progress is checkpointed after every batch, and
+documents that are already current are never touched again. Every batch
+bumps the collection version, since re-encoding rounds amounts to cents and
+cached analytics must be recomputed.
+
+Usage: python migrate_compact_schema.py [--batch-size N] [--compact] [--restart]
+"""
+
+import sys
+import os
+import argparse
+import logging
+from datetime import datetime
+
+# Add the parent directory to the path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import MongoClient, ReplaceOne
+from app.repositories import MongoSurveyRepository
+from app.schema import FIELDS, SCHEMA_VERSION, encode_document, decode_document
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MIGRATION_ID = f'compact_schema_v{SCHEMA_VERSION}'
+
+
+def get_storage_stats(db):
+    """Return the collStats figures relevant to the migration"""
+    stats = db.command('collStats', 'survey_responses')
+    return {
+        'count': stats.get('count', 0),
+        'size': stats.get('size', 0),
+        'avg_obj_size': stats.get('avgObjSize', 0),
+        'storage_size': stats.get('storageSize', 0),
+        'total_index_size': stats.get('totalIndexSize', 0)
+    }
+
+
+def migrate_to_compact_schema(db, batch_size=1000, restart=False):
+    """
+    Convert every older document to the current compact schema.
+    Returns the number of documents converted by this run.
+    """
+    checkpoints = db.migrations
+    if restart:
+        checkpoints.delete_one({'_id': MIGRATION_ID})
+    
+    checkpoint = checkpoints.find_one({'_id': MIGRATION_ID}) or {}
+    last_id = checkpoint.get('last_id')
+    if last_id:
+        logger.info(f"Resuming migration after document {last_id}")
+    
+    converted = 0
+    legacy_filter = {FIELDS['version']: {'$ne': SCHEMA_VERSION}}
+    
+    while True:
+        query = dict(legacy_filter)
+        if last_id:
+            query['_id'] = {'$gt': last_id}
+        
+        batch = list(db.survey_responses.find(query).sort('_id', 1).limit(batch_size))
+        if not batch:
+            break
+        
+        # The version guard makes a replayed batch a no-op
+        requests = [
+            ReplaceOne({'_id': doc['_id'], **legacy_filter}, encode_document(decode_document(doc)))
+            for doc in batch
+        ]
+        result = db.survey_responses.bulk_write(requests, ordered=False)
+        if result.modified_count:
+            MongoSurveyRepository(db).bump_version()
+        converted += result.modified_count
+        last_id = batch[-1]['_id']
+        
+        checkpoints.update_one(
+            {'_id': MIGRATION_ID},
+            {'$set': {'last_id': last_id, 'updated_at': datetime.utcnow()},
+             '$inc': {'converted': result.modified_count}},
+            upsert=True
+        )
+        logger.info(f"Converted {converted} documents so far")
+    
+    # A later run scans from the start again, so documents written in an
+    # older schema after this run (e.g. by a stale worker) are not skipped
+    checkpoints.update_one(
+        {'_id': MIGRATION_ID},
+        {'$set': {'completed_at': datetime.utcnow()}, '$unset': {'last_id': ''}},
+        upsert=True
+    )
+    return converted
+
+
+def print_storage_report(before, after):
+    """Print formatted before/after storage figures"""
+    print("\n" + "="*60)
+    print("COMPACT SCHEMA MIGRATION REPORT")
+    print("="*60)
+    
+    for label, key in [('Documents', 'count'), ('Data Size (bytes)', 'size'),
+                       ('Average Document Size (bytes)', 'avg_obj_size'),
+                       ('Storage Size (bytes)', 'storage_size'),
+                       ('Total Index Size (bytes)', 'total_index_size')]:
+        saved = before[key] - after[key]
+        percentage = (saved / before[key]) * 100 if before[key] else 0
+        print(f"  {label}: {before[key]:,} -> {after[key]:,} (saved {saved:,}, {percentage:.1f}%)")
+    
+    print("\nNote: WiredTiger only releases disk space after the collection is compacted (--compact).")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Migrate survey responses to the compact document schema')
+    parser.add_argument('--batch-size', type=int, default=1000, help='documents rewritten per bulk write')
+    parser.add_argument('--compact', action='store_true', help='run the compact command afterwards to release disk space')
+    parser.add_argument('--restart', action='store_true', help='ignore the saved checkpoint and scan from the beginning')
+    args = parser.parse_args()
+    
+    # A plain client: the app's spool replayer and profiler threads are not wanted here
+    client = MongoClient(os.environ.get('MONGO_URI', 'mongodb://mongodb:27017/healthcare_survey'))
+    try:
+        client.admin.command('ping')
+    except Exception as e:
+        print(f"\n❌ MongoDB is not available. Check MONGO_URI. ({e})")
+        sys.exit(1)
+    db = client.healthcare_survey
+    
+    before = get_storage_stats(db)
+    converted = migrate_to_compact_schema(db, batch_size=args.batch_size, restart=args.restart)
+    
+    if args.compact:
+        logger.info("Compacting survey_responses collection...")
+        db.command('compact', 'survey_responses')
+    
+    after = get_storage_stats(db)
+    print(f"\n✅ Converted {converted} documents to schema version {SCHEMA_VERSION}")
+    print_storage_report(before, after)
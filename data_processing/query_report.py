@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+MongoDB Query Report for Healthcare Survey Data
+Prints the query fingerprints that cost the most database time, merged from
+the statistics every app and script process writes through
+app.query_profiler.QueryProfiler (QUERY_STATS_PATH, default data/query_stats).
+
+Usage: python query_report.py [--top N] [--sort total|mean|max|calls] [--path DIR]
+"""
+
+import sys
+import os
+import argparse
+
+# Add the parent directory to the path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.query_profiler import load_statistics
+
+SORT_KEYS = {
+    'total': lambda entry: entry['total_ms'],
+    'mean': lambda entry: entry['total_ms'] / max(entry['calls'], 1),
+    'max': lambda entry: entry['max_ms'],
+    'calls': lambda entry: entry['calls'],
+}
+
+
+def top_fingerprints(stats, top=10, sort='total'):
+    """The `top` fingerprints ordered by `sort`, most expensive first"""
+    ranked = sorted(stats.items(), key=lambda item: SORT_KEYS[sort](item[1]), reverse=True)
+    return ranked[:top]
+
+
+def print_report(stats, top=10, sort='total'):
+    """Print formatted query statistics"""
+    print("\n" + "="*60)
+    print("MONGODB QUERY REPORT")
+    print("="*60)
+    
+    if not stats:
+        print("\nNo query statistics recorded yet")
+        print("\n" + "="*60)
+        return
+    
+    total_ms = sum(entry['total_ms'] for entry in stats.values())
+    print(f"\nFingerprints: {len(stats):,}")
+    print(f"Commands: {sum(entry['calls'] for entry in stats.values()):,}")
+    print(f"Database Time: {total_ms:,.1f} ms")
+    print(f"\nTop {min(top, len(stats))} by {sort}:")
+    
+    for rank, (key, entry) in enumerate(top_fingerprints(stats, top, sort), 1):
+        mean_ms = entry['total_ms'] / max(entry['calls'], 1)
+        share = entry['total_ms'] / total_ms * 100 if total_ms else 0
+        print(f"\n  {rank}. {key}")
+        print(f"     total {entry['total_ms']:,.1f} ms ({share:.1f}%), {entry['calls']:,} calls, "
+              f"mean {mean_ms:,.1f} ms, max {entry['max_ms']:,.1f} ms")
+        if entry['getmores'] or entry['slow'] or entry['errors']:
+            print(f"     getMore batches: {entry['getmores']:,}, slow: {entry['slow']:,}, errors: {entry['errors']:,}")
+        if entry['plan']:
+            print(f"     plan: {entry['plan']}")
+    print("\n" + "="*60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Report the most expensive MongoDB query shapes')
+    parser.add_argument('--path', default=os.environ.get('QUERY_STATS_PATH', 'data/query_stats'),
+                        help='directory of per-process statistics files')
+    parser.add_argument('--top', type=int, default=10, help='number of fingerprints to show')
+    parser.add_argument('--sort', choices=sorted(SORT_KEYS), default='total', help='ranking criterion')
+    args = parser.parse_args()
+    
+    print_report(load_statistics(args.path), top=args.top, sort=args.sort)
@@ -0,0 +1,35 @@
+"""
+Synthetic survey responses for the benchmarks.
+
+build_documents returns response documents in the shape the repositories
+return them, drawn from a seeded random stream so every run of a benchmark
+works on the same data. No database is needed.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+from bson import ObjectId
+
+from app.schema import EXPENSE_CATEGORIES
+
+
+def build_documents(rows, seed=42):
+    """Response documents in the shape the repositories return"""
+    rng = np.random.default_rng(seed)
+    ages = rng.integers(18, 71, rows).tolist()
+    genders = rng.choice(['male', 'female', 'other'], size=rows).tolist()
+    incomes = (rng.exponential(3000, rows) + 2000).round(2).tolist()
+    expenses = rng.exponential(200, (rows, len(EXPENSE_CATEGORIES))).round(2).tolist()
+    start = datetime(2025, 1, 1)
+    return [
+        {
+            '_id': ObjectId(),
+            'age': ages[i],
+            'gender': genders[i],
+            'total_income': incomes[i],
+            'expenses': dict(zip(EXPENSE_CATEGORIES, expenses[i])),
+            'created_at': start + timedelta(seconds=i)
+        }
+        for i in range(rows)
+    ]
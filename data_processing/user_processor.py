@@ -1,25 +1,110 @@
 import pandas as pd
+import numpy as np
 import csv
+import gc
 import os
+import shutil
+import tempfile
 from datetime import datetime
+from itertools import islice
 import logging
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+EXPENSE_CATEGORIES = ['utilities', 'entertainment', 'school_fees', 'shopping', 'healthcare']
+# Fields read from each SurveyResponse or raw record
+RECORD_FIELDS = ['_id', 'user_id', 'age', 'gender', 'total_income', 'expenses', 'created_at']
+SUMMED_FIELDS = ['age', 'total_income'] + EXPENSE_CATEGORIES + ['expense_ratio', 'savings']
+
+
+def validate_user_columns(ages, total_incomes, expenses):
+    """
+    Validate whole columns of user data in one vectorized pass.
+    
+    Applies the same rules as User._validate_data to arrays instead of single
+    objects. `expenses` maps each category to an array aligned with `ages`.
+    Returns a tuple of (valid_mask, rejects) where rejects is a list of
+    {'index': row, 'reason': message} dicts, one per rejected row, using the
+    first rule the row failed.
+    """
+    ages = np.asarray(ages, dtype=np.float64)
+    total_incomes = np.asarray(total_incomes, dtype=np.float64)
+    
+    checks = [
+        (np.isnan(ages) | (ages < 0) | (ages > 150), 'Invalid age: {:g}', ages),
+        (np.isnan(total_incomes) | (total_incomes < 0), 'Invalid income: {}', total_incomes)
+    ]
+    for category, amounts in expenses.items():
+        amounts = np.asarray(amounts, dtype=np.float64)
+        checks.append((np.isnan(amounts) | (amounts < 0),
+                       f'Invalid expense amount for {category}: {{}}', amounts))
+    
+    rejected = np.zeros(len(ages), dtype=bool)
+    rejects = []
+    for failed, message, values in checks:
+        # Only report the first failing rule for each row
+        failed = failed & ~rejected
+        rejected |= failed
+        rows = np.flatnonzero(failed)
+        rejects.extend(
+            {'index': row, 'reason': message.format(value)}
+            for row, value in zip(rows.tolist(), values[rows].tolist())
+        )
+    
+    rejects.sort(key=lambda reject: reject['index'])
+    return ~rejected, rejects
+
 
 class User:
     """User class for processing healthcare survey data"""
     
-    def __init__(self, age, gender, total_income, expenses, user_id=None, created_at=None):
+    def __init__(self, age, gender, total_income, expenses, user_id=None, created_at=None, validate=True):
         self.user_id = user_id
         self.age = int(age)
         self.gender = str(gender).lower()
         self.total_income = float(total_income)
         self.expenses = expenses if isinstance(expenses, dict) else {}
         self.created_at = created_at or datetime.now()
-        self._validate_data()
+        if validate:
+            self._validate_data()
+    
+    @classmethod
+    def from_columns(cls, ages, genders, total_incomes, expenses, user_ids, created_ats):
+        """
+        Users from aligned columns that have already been validated. Values
+        are converted a whole column at a time and set directly, rather than
+        going through __init__ once per row.
+        """
+        now = datetime.now()
+        rows = zip(
+            user_ids,
+            np.asarray(ages, dtype=np.float64).astype(np.int64).tolist(),
+            [str(gender).lower() for gender in genders],
+            np.asarray(total_incomes, dtype=np.float64).tolist(),
+            expenses,
+            [created_at or now for created_at in created_ats]
+        )
+        # Each collection pass triggered while allocating traverses every
+        # user created so far; rows hold no reference cycles, so pause it
+        users = []
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            for user_id, age, gender, total_income, user_expenses, created_at in rows:
+                user = cls.__new__(cls)
+                user.user_id = user_id
+                user.age = age
+                user.gender = gender
+                user.total_income = total_income
+                user.expenses = user_expenses
+                user.created_at = created_at
+                users.append(user)
+        finally:
+            if collecting:
+                gc.enable()
+        return users
     
     def _validate_data(self):
         if self.age < 0 or self.age > 150:
@@ -116,50 +201,458 @@ class User:
         return self.__str__()
 
 
-class UserDataProcessor:
-    """Class for processing collections of User data"""
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with bounded relative error.
+    
+    Values are counted in logarithmic buckets (the DDSketch scheme), so memory
+    depends on the range of the values rather than how many there are, and
+    sketches built from separate chunks merge by adding bucket counts. Any
+    quantile is returned within `relative_accuracy` of an actual value.
+    """
+    
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+    
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        positive = values[values > 0]
+        keys, counts = np.unique(np.ceil(np.log(positive) / np.log(self.gamma)).astype(np.int64),
+                                 return_counts=True)
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.zero_count += len(values) - len(positive)
+        self.count += len(values)
+    
+    def merge(self, other):
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+    
+    def quantile(self, q):
+        if not self.count:
+            return None
+        
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                # Midpoint of the bucket (gamma^(key-1), gamma^key] in relative terms
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class PartialStatistics:
+    """
+    Mergeable aggregates for one chunk of users.
+    
+    Holds counts, sums, min/max, gender counts and median sketches, so chunks
+    can be summarized independently and combined into the same dict
+    UserDataProcessor.get_statistics returns for in-memory data.
+    """
     
     def __init__(self):
+        self.count = 0
+        self.sums = {field: 0.0 for field in SUMMED_FIELDS}
+        self.minimums = {}
+        self.maximums = {}
+        self.gender_counts = {}
+        self.overspending_count = 0
+        self.sketches = {'age': QuantileSketch(), 'total_income': QuantileSketch()}
+    
+    @classmethod
+    def from_frame(cls, frame):
+        """Aggregates of a DataFrame shaped like UserDataProcessor.export_to_pandas()"""
+        partial = cls()
+        if frame.empty:
+            return partial
+        
+        partial.count = len(frame)
+        for field in SUMMED_FIELDS:
+            partial.sums[field] = float(frame[field].sum())
+        for field in partial.sketches:
+            values = frame[field].to_numpy(dtype=np.float64)
+            partial.minimums[field] = float(values.min())
+            partial.maximums[field] = float(values.max())
+            partial.sketches[field].add(values)
+        partial.gender_counts = {
+            str(gender): int(count) for gender, count in frame['gender'].value_counts().items()
+        }
+        partial.overspending_count = int((frame['total_expenses'] > frame['total_income']).sum())
+        return partial
+    
+    def merge(self, other):
+        self.count += other.count
+        for field, total in other.sums.items():
+            self.sums[field] += total
+        for field, value in other.minimums.items():
+            self.minimums[field] = min(self.minimums.get(field, value), value)
+        for field, value in other.maximums.items():
+            self.maximums[field] = max(self.maximums.get(field, value), value)
+        for gender, count in other.gender_counts.items():
+            self.gender_counts[gender] = self.gender_counts.get(gender, 0) + count
+        self.overspending_count += other.overspending_count
+        for field, sketch in other.sketches.items():
+            self.sketches[field].merge(sketch)
+        return self
+    
+    def _field_stats(self, field):
+        return {
+            'mean': self.sums[field] / self.count,
+            'median': self.sketches[field].quantile(0.5),
+            'min': self.minimums[field],
+            'max': self.maximums[field]
+        }
+    
+    def to_statistics(self):
+        if not self.count:
+            return {}
+        
+        return {
+            'total_users': self.count,
+            'age_stats': self._field_stats('age'),
+            'income_stats': self._field_stats('total_income'),
+            'gender_distribution': dict(sorted(self.gender_counts.items(), key=lambda item: -item[1])),
+            'expense_stats': {category: self.sums[category] / self.count for category in EXPENSE_CATEGORIES},
+            'financial_health': {
+                'avg_expense_ratio': self.sums['expense_ratio'] / self.count,
+                'overspending_count': self.overspending_count,
+                'avg_savings': self.sums['savings'] / self.count
+            }
+        }
+
+
+class UserDataProcessor:
+    """
+    Class for processing collections of User data
+    
+    With `chunk_size` set, at most that many users are held in memory: each
+    full chunk is folded into mergeable partial statistics and spilled to a
+    Parquet partition in `spill_dir` (a temporary directory by default), so
+    statistics, exports and filters work on datasets larger than memory.
+    Pass spill=False when only statistics are needed. Use the processor as a
+    context manager, or call close(), to remove a temporary spill directory.
+    """
+    
+    def __init__(self, chunk_size=None, spill_dir=None, spill=True):
         self.users = []
         self.csv_headers = [
             'user_id', 'age', 'gender', 'total_income',
             'utilities', 'entertainment', 'school_fees', 'shopping', 'healthcare',
             'total_expenses', 'savings', 'expense_ratio', 'created_at'
         ]
+        self.chunk_size = chunk_size
+        self.spill = spill
+        self.spill_dir = spill_dir
+        self._partial = PartialStatistics()
+        self._partitions = []
+        self._flushed_count = 0
+        self._owns_spill_dir = False
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+    
+    def close(self):
+        """Drop all users and remove the spill directory if this processor created it"""
+        self.clear_users()
+        if self._owns_spill_dir:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+            self.spill_dir = None
+            self._owns_spill_dir = False
     
     def add_user(self, user):
         if not isinstance(user, User):
             raise TypeError("Expected User instance")
         self.users.append(user)
+        self._flush_if_full()
     
     def add_users_from_data(self, data_list):
-        for data in data_list:
-            try:
-                if hasattr(data, 'to_dict'):
-                    user = User(
-                        age=data.age,
-                        gender=data.gender,
-                        total_income=data.total_income,
-                        expenses=data.expenses,
-                        user_id=str(data._id),
-                        created_at=data.created_at
-                    )
-                else:
-                    user = User(
-                        age=data.get('age'),
-                        gender=data.get('gender'),
-                        total_income=data.get('total_income'),
-                        expenses=data.get('expenses', {}),
-                        user_id=data.get('_id') or data.get('user_id'),
-                        created_at=data.get('created_at')
-                    )
-                self.add_user(user)
-            except (ValueError, KeyError) as e:
-                logger.warning(f"Skipping invalid user data: {e}")
-                continue
+        if not self.chunk_size:
+            report = self._add_users_batch(data_list)
+        else:
+            # Read the input lazily, one chunk at a time
+            report = {'accepted': 0, 'rejects': []}
+            records = iter(data_list)
+            offset = 0
+            while True:
+                batch = list(islice(records, self.chunk_size))
+                if not batch:
+                    break
+                batch_report = self._add_users_batch(batch)
+                report['accepted'] += batch_report['accepted']
+                report['rejects'].extend(
+                    {'index': offset + reject['index'], 'reason': reject['reason']}
+                    for reject in batch_report['rejects']
+                )
+                offset += len(batch)
+        
+        if report['rejects']:
+            logger.warning(f"Skipped {len(report['rejects'])} invalid user records")
+        return report
+    
+    def _add_users_batch(self, data_list):
+        # Iterated twice below, so a generator is read into a list once
+        data_list = list(data_list)
+        # SurveyResponse attributes and raw dicts share the same field names
+        records = [vars(data) if hasattr(data, 'to_dict') else data for data in data_list]
+        frame = pd.DataFrame(records, columns=RECORD_FIELDS, dtype=object)
+        if not len(frame):
+            return {'accepted': 0, 'rejects': []}
+        
+        frame['expenses'] = [value if isinstance(value, dict) else {} for value in frame['expenses'].tolist()]
+        keys = set().union(*frame['expenses'])
+        categories = [category for category in EXPENSE_CATEGORIES if category in keys]
+        categories += sorted(keys.difference(EXPENSE_CATEGORIES), key=str)
+        expense_frame = pd.DataFrame(frame['expenses'].tolist(), index=frame.index, columns=categories)
+        amounts = expense_frame.apply(pd.to_numeric, errors='coerce')
+        present = expense_frame.notna()
+        frame['age'] = pd.to_numeric(frame['age'], errors='coerce')
+        frame['total_income'] = pd.to_numeric(frame['total_income'], errors='coerce')
+        
+        # Absent expense keys count as 0; present but non-numeric ones stay NaN and reject the row
+        valid_mask, rejects = validate_user_columns(
+            frame['age'], frame['total_income'],
+            {category: amounts[category].where(present[category], 0) for category in amounts.columns}
+        )
+        
+        # Rows holding numbers as text get dicts of the converted amounts; the rest keep their own
+        converted = np.zeros(len(frame), dtype=bool)
+        for category in expense_frame.columns:
+            if expense_frame[category].dtype == object:
+                converted |= expense_frame[category].map(lambda value: isinstance(value, str)).to_numpy()
+        if converted.any():
+            expenses = frame['expenses'].tolist()
+            amount_rows, present_rows = amounts.to_numpy().tolist(), present.to_numpy().tolist()
+            for row in np.flatnonzero(converted).tolist():
+                expenses[row] = {
+                    category: amount
+                    for category, amount, has in zip(categories, amount_rows[row], present_rows[row]) if has
+                }
+            frame['expenses'] = expenses
+        
+        # SurveyResponse ids are stringified, record ids kept as given and
+        # records without an id get None, which the CSV export writes as ''
+        user_ids = frame['_id'].where(frame['_id'].notna(), frame['user_id'])
+        user_ids = user_ids.where(user_ids.notna(), None).tolist()
+        frame['user_id'] = [
+            str(user_id) if record is not data and user_id is not None else user_id
+            for record, data, user_id in zip(records, data_list, user_ids)
+        ]
+        
+        frame = frame[valid_mask]
+        self._append_users(
+            frame['age'].tolist(),
+            frame['gender'].where(frame['gender'].notna(), None).tolist(),
+            frame['total_income'].tolist(),
+            frame['expenses'].tolist(),
+            frame['user_id'].tolist(),
+            frame['created_at'].where(frame['created_at'].notna(), None).tolist()
+        )
+        return {'accepted': len(frame), 'rejects': rejects}
+    
+    def add_users_from_columns(self, age, gender, total_income, expenses, user_id=None, created_at=None):
+        """
+        Add users from column arrays, validating every row in one vectorized pass.
+        
+        `expenses` maps each category to an array aligned with `age`. Rows that
+        fail validation are skipped and returned in the report together with
+        the reason, instead of being logged one at a time.
+        """
+        valid_mask, rejects = validate_user_columns(age, total_income, expenses)
+        
+        rows = np.flatnonzero(valid_mask)
+        count = len(valid_mask)
+        user_id = user_id if user_id is not None else [None] * count
+        created_at = created_at if created_at is not None else [None] * count
+        
+        def take(values):
+            # Python objects rather than NumPy scalars for the User attributes
+            return np.asarray(values, dtype=object)[rows].tolist()
+        
+        categories = list(expenses)
+        expense_rows = zip(*[np.asarray(amounts, dtype=np.float64)[rows].tolist() for amounts in expenses.values()])
+        self._append_users(
+            np.asarray(age)[rows].tolist(),
+            take(gender),
+            np.asarray(total_income, dtype=np.float64)[rows].tolist(),
+            [dict(zip(categories, amounts)) for amounts in expense_rows] if categories else [{}] * len(rows),
+            take(user_id),
+            take(created_at)
+        )
+        return {'accepted': len(rows), 'rejects': rejects}
+    
+    def _append_users(self, *columns):
+        """Append already validated users given as aligned columns"""
+        users = User.from_columns(*columns)
+        if not self.chunk_size:
+            self.users.extend(users)
+            return
+        for user in users:
+            self.users.append(user)
+            self._flush_if_full()
+    
+    def add_users_from_arrow(self, batches):
+        """
+        Add users from a pyarrow Table or RecordBatch in the app.columnar schema,
+        or an iterable of them such as SurveyResponse.iter_record_batches().
+        
+        Columns are validated and converted as whole arrays. In chunked mode
+        the rows go straight into the partial statistics and spilled
+        partitions without creating a User per row. Reject indexes count rows
+        across all batches.
+        """
+        if hasattr(batches, 'column'):
+            batches = [batches]
+        
+        report = {'accepted': 0, 'rejects': []}
+        offset = 0
+        pending = []
+        for batch in batches:
+            columns = {name: batch.column(name).to_numpy(zero_copy_only=False)
+                       for name in ['id', 'age', 'gender', 'total_income'] + EXPENSE_CATEGORIES}
+            expenses = {category: columns[category] for category in EXPENSE_CATEGORIES}
+            
+            if self.chunk_size:
+                valid_mask, rejects = validate_user_columns(columns['age'], columns['total_income'], expenses)
+                pending.append(self._columns_frame(columns, batch.column('created_at'), valid_mask))
+                pending = self._flush_frames(pending)
+                batch_report = {'accepted': int(valid_mask.sum()), 'rejects': rejects}
+            else:
+                batch_report = self.add_users_from_columns(
+                    age=columns['age'],
+                    gender=columns['gender'],
+                    total_income=columns['total_income'],
+                    expenses=expenses,
+                    user_id=columns['id'],
+                    created_at=batch.column('created_at').to_pylist()
+                )
+            
+            report['accepted'] += batch_report['accepted']
+            report['rejects'].extend(
+                {'index': offset + reject['index'], 'reason': reject['reason']}
+                for reject in batch_report['rejects']
+            )
+            offset += len(batch)
+        
+        if pending:
+            self._flush_frames(pending, final=True)
+        if report['rejects']:
+            logger.warning(f"Skipped {len(report['rejects'])} invalid user records")
+        return report
+    
+    @staticmethod
+    def _columns_frame(columns, created_at, valid_mask):
+        """The export_to_pandas() frame for the valid rows of a columnar batch"""
+        frame = pd.DataFrame({
+            'user_id': columns['id'][valid_mask],
+            'age': columns['age'][valid_mask].astype(np.int64),
+            'gender': pd.Series(columns['gender'][valid_mask], dtype=object).str.lower(),
+            'total_income': columns['total_income'][valid_mask]
+        })
+        # Summed in category order, like User.calculate_total_expenses
+        total_expenses = 0
+        for category in EXPENSE_CATEGORIES:
+            frame[category] = columns[category][valid_mask]
+            total_expenses = total_expenses + frame[category].to_numpy()
+        total_income = frame['total_income'].to_numpy()
+        frame['total_expenses'] = total_expenses
+        frame['savings'] = total_income - total_expenses
+        with np.errstate(divide='ignore', invalid='ignore'):
+            frame['expense_ratio'] = np.where(total_income == 0, 0, total_expenses / total_income * 100)
+        
+        # datetime.isoformat() text: microseconds only when there are any
+        timestamps = created_at.to_numpy(zero_copy_only=False)[valid_mask].astype('datetime64[us]')
+        text = np.datetime_as_string(timestamps, unit='us')
+        whole_seconds = timestamps.astype('datetime64[s]') == timestamps
+        frame['created_at'] = np.where(whole_seconds, text.astype('<U19'), text)
+        return frame
+    
+    def _flush_frames(self, frames, final=False):
+        """
+        Flush the rows of `frames` in chunk_size pieces; returns the frames
+        still pending, so small batches are combined into full chunks
+        """
+        if not final and sum(len(frame) for frame in frames) < self.chunk_size:
+            return frames
+        
+        # Buffered users come first so the export keeps the input order
+        if self.users:
+            self._flush_chunk()
+        frame = pd.concat(frames, ignore_index=True)
+        full = len(frame) if final else len(frame) - len(frame) % self.chunk_size
+        for start in range(0, full, self.chunk_size):
+            self._flush_frame(frame.iloc[start:start + self.chunk_size].reset_index(drop=True))
+        return [frame.iloc[full:].reset_index(drop=True)] if full < len(frame) else []
+    
+    def _flush_if_full(self):
+        if self.chunk_size and len(self.users) >= self.chunk_size:
+            self._flush_chunk()
+    
+    def _flush_chunk(self):
+        """Fold the buffered users into the partial statistics and spill them to disk"""
+        self._flush_frame(self._users_frame(self.users))
+        self.users = []
+    
+    def _flush_frame(self, frame):
+        self._partial.merge(PartialStatistics.from_frame(frame))
+        
+        if self.spill:
+            if self.spill_dir is None:
+                self.spill_dir = tempfile.mkdtemp(prefix='user_processor_')
+                self._owns_spill_dir = True
+            os.makedirs(self.spill_dir, exist_ok=True)
+            path = os.path.join(self.spill_dir, f'chunk-{len(self._partitions):06d}.parquet')
+            # ObjectIds have no Parquet type
+            frame['user_id'] = [None if value is None else str(value) for value in frame['user_id']]
+            frame.to_parquet(path, index=False)
+            self._partitions.append(path)
+        
+        self._flushed_count += len(frame)
+    
+    @staticmethod
+    def _users_frame(users):
+        return pd.DataFrame([user.to_dict() for user in users])
+    
+    @staticmethod
+    def _frame_users(frame):
+        return [
+            User(
+                age=row['age'],
+                gender=row['gender'],
+                total_income=row['total_income'],
+                expenses={category: row[category] for category in EXPENSE_CATEGORIES},
+                user_id=row['user_id'],
+                created_at=row['created_at'],
+                validate=False
+            )
+            for row in frame.to_dict('records')
+        ]
+    
+    def iter_frames(self):
+        """Yield the users as DataFrames: spilled partitions first, then the in-memory buffer"""
+        if self._flushed_count and not self.spill:
+            raise ValueError("Flushed users were not spilled to disk (spill=False); only statistics are available")
+        
+        for path in self._partitions:
+            yield pd.read_parquet(path)
+        if self.users:
+            yield self._users_frame(self.users)
     
     def export_to_csv(self, file_path='./exports/survey_data.csv'):
-        if not self.users:
+        if not len(self):
             logger.warning("No users to export")
             return False
         
@@ -170,27 +663,40 @@ class UserDataProcessor:
                 writer = csv.writer(csvfile)
                 
                 writer.writerow(self.csv_headers)
-                for user in self.users:
-                    writer.writerow(user.to_csv_row())
+                if self.chunk_size:
+                    for frame in self.iter_frames():
+                        frame[self.csv_headers].to_csv(csvfile, header=False, index=False,
+                                                      lineterminator=writer.dialect.lineterminator)
+                else:
+                    for user in self.users:
+                        writer.writerow(user.to_csv_row())
             
-            logger.info(f"Successfully exported {len(self.users)} users to {file_path}")
+            logger.info(f"Successfully exported {len(self)} users to {file_path}")
             return True
-            
+        
         except Exception as e:
             logger.error(f"Error exporting to CSV: {e}")
             return False
     
     def export_to_pandas(self):
-        if not self.users:
+        """All users in one DataFrame; in chunked mode this reads every spilled partition back"""
+        if not len(self):
             return pd.DataFrame()
         
-        data = [user.to_dict() for user in self.users]
-        return pd.DataFrame(data)
+        if self.chunk_size:
+            return pd.concat(list(self.iter_frames()), ignore_index=True)
+        return self._users_frame(self.users)
     
     def get_statistics(self):
-        if not self.users:
+        if not len(self):
             return {}
         
+        if self.chunk_size:
+            partial = PartialStatistics().merge(self._partial)
+            if self.users:
+                partial.merge(PartialStatistics.from_frame(self._users_frame(self.users)))
+            return partial.to_statistics()
+        
         df = self.export_to_pandas()
         
         stats = {
@@ -225,7 +731,17 @@ class UserDataProcessor:
         return stats
     
     def get_users_by_criteria(self, **criteria):
-        filtered_users = self.users
+        if not self.chunk_size:
+            return self._filter_users(self.users, criteria)
+        
+        filtered_users = []
+        for frame in self.iter_frames():
+            filtered_users.extend(self._filter_users(self._frame_users(frame), criteria))
+        return filtered_users
+    
+    @staticmethod
+    def _filter_users(users, criteria):
+        filtered_users = users
         
         for key, value in criteria.items():
             if key == 'min_age':
@@ -248,9 +764,14 @@ class UserDataProcessor:
     
     def clear_users(self):
         self.users.clear()
+        for path in self._partitions:
+            os.remove(path)
+        self._partitions = []
+        self._partial = PartialStatistics()
+        self._flushed_count = 0
     
     def __len__(self):
-        return len(self.users)
+        return self._flushed_count + len(self.users)
     
     def __str__(self):
-        return f"UserDataProcessor(users={len(self.users)})"
\ No newline at end of file
+        return f"UserDataProcessor(users={len(self)})"
\ No newline at end of file
@@ -30,10 +30,10 @@ def main():
     print(f"🔧 Debug Mode: {debug}")
     print(f"📊 Environment: {os.environ.get('FLASK_ENV', 'development')}")
     
-    if hasattr(app, 'db') and app.db is not None:
-        print("✅ MongoDB: Connected")
+    if getattr(app, 'repository', None) is not None:
+        print(f"✅ Storage: {app.repository.name} connected")
     else:
-        print("❌ MongoDB: Connection failed")
+        print("❌ Storage: Connection failed")
         print("⚠️  The application will run but data won't be saved")
     
     print("="*60)
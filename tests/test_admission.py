@@ -0,0 +1,33 @@
+import pytest
+
+from app.admission import AdmissionController
+
+
+@pytest.mark.parametrize('record_latency', [True, False])
+def test_track_propagates_exceptions(record_latency):
+    admission = AdmissionController()
+    
+    with pytest.raises(RuntimeError, match='database down'):
+        with admission.track(record_latency=record_latency):
+            raise RuntimeError('database down')
+    
+    assert admission.in_flight == 0
+
+
+def test_track_without_latency_leaves_average_untouched():
+    admission = AdmissionController()
+    
+    with admission.track(record_latency=False):
+        pass
+    
+    assert admission.avg_latency_ms == 0.0
+    assert admission.in_flight == 0
+
+
+def test_in_flight_limit_fires_below_thread_count():
+    # Each gunicorn worker runs 8 threads, so the default limit must be reachable
+    admission = AdmissionController()
+    
+    with admission.track(), admission.track(), admission.track():
+        assert admission.is_overloaded()
+    assert not admission.is_overloaded()
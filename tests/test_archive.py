@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app import create_app
+from app.archive import ResponseArchive, merge_statistics
+from app.models import SurveyResponse
+from app.repositories import SQLiteSurveyRepository
+from data_processing.archive_responses import archive_old_responses, finish_pending_partitions
+
+OLD = datetime(2020, 1, 1)
+
+
+def make_documents(count, start=OLD):
+    return [
+        {'_id': ObjectId(), 'age': 20 + i, 'gender': ['male', 'female'][i % 2], 'total_income': 1000.0 * (i + 1),
+         'expenses': {'utilities': 10.0 * i, 'healthcare': 5.0}, 'created_at': start + timedelta(days=i % 3)}
+        for i in range(count)
+    ]
+
+
+def combined_statistics(repository, archive):
+    return merge_statistics(repository.get_statistics(), archive.summary())
+
+
+def assert_same_statistics(actual, expected):
+    assert actual['total_responses'] == expected['total_responses']
+    assert actual['gender_distribution'] == expected['gender_distribution']
+    assert actual['avg_age'] == pytest.approx(expected['avg_age'])
+    assert actual['avg_income'] == pytest.approx(expected['avg_income'])
+    assert actual['expense_totals'] == pytest.approx(expected['expense_totals'])
+
+
+@pytest.fixture
+def repository(tmp_path):
+    return SQLiteSurveyRepository(str(tmp_path / 'survey.db'))
+
+
+@pytest.fixture
+def archive(tmp_path, repository):
+    return ResponseArchive(str(tmp_path / 'archive'),
+                           hot_contains=lambda response_id: repository.find_by_id(response_id) is not None)
+
+
+def test_archiving_moves_old_responses_and_keeps_statistics(repository, archive):
+    docs = make_documents(10) + make_documents(2, start=datetime.utcnow())
+    repository.insert_many(docs)
+    before = combined_statistics(repository, archive)
+    
+    assert archive_old_responses(repository, archive, older_than_days=30, batch_size=4) == 10
+    
+    assert len(repository.find_all()) == 2
+    assert sum(partition['rows'] for partition in archive.partitions()) == 10
+    assert all(partition['status'] == 'committed' for partition in archive.partitions())
+    assert_same_statistics(combined_statistics(repository, archive), before)
+
+
+def test_pending_partition_is_hidden_until_hot_copies_are_deleted(repository, archive):
+    docs = make_documents(6)
+    repository.insert_many(docs)
+    before = combined_statistics(repository, archive)
+    
+    # Interrupted after writing the partitions, before deleting the hot copies
+    entries = archive.write_pending(docs)
+    assert archive.partitions() == []
+    assert_same_statistics(combined_statistics(repository, archive), before)
+    
+    # Interrupted after the delete, before the commit
+    repository.delete_by_ids([doc['_id'] for doc in docs])
+    assert len(archive.partitions()) == len(entries)
+    assert_same_statistics(combined_statistics(repository, archive), before)
+
+
+def test_interrupted_run_is_finished_on_the_next_one(repository, archive):
+    docs = make_documents(6)
+    repository.insert_many(docs)
+    before = combined_statistics(repository, archive)
+    archive.write_pending(docs)
+    
+    assert finish_pending_partitions(repository, archive) == 3
+    
+    assert repository.find_all() == []
+    assert {partition['status'] for partition in archive.partitions(include_pending=True)} == {'committed'}
+    assert_same_statistics(combined_statistics(repository, archive), before)
+
+
+def test_merge_statistics_weights_averages_by_count():
+    hot = {'total_responses': 2, 'avg_age': 30.0, 'avg_income': 1000.0,
+           'gender_distribution': {'male': 2}, 'expense_totals': {'utilities': 10.0}}
+    archived = {'count': 2, 'age_sum': 100, 'income_sum': 6000.0, 'gender_counts': {'male': 1, 'female': 1},
+                'expense_sums': {'utilities': 5.0, 'entertainment': 1.0, 'school_fees': 0.0,
+                                 'shopping': 0.0, 'healthcare': 2.0}}
+    
+    merged = merge_statistics(hot, archived)
+    
+    assert merged['total_responses'] == 4
+    assert merged['avg_age'] == pytest.approx(40.0)
+    assert merged['avg_income'] == pytest.approx(2000.0)
+    assert merged['gender_distribution'] == {'male': 3, 'female': 1}
+    assert merged['expense_totals']['utilities'] == 15.0
+    assert merged['expense_totals']['healthcare'] == 2.0
+
+
+def test_find_by_id_and_delete_all_cover_the_archive(tmp_path, monkeypatch):
+    monkeypatch.setenv('STORAGE_BACKEND', 'sqlite')
+    monkeypatch.setenv('SQLITE_PATH', str(tmp_path / 'survey.db'))
+    monkeypatch.setenv('ARCHIVE_PATH', str(tmp_path / 'archive'))
+    monkeypatch.setenv('SHARED_CACHE_ENABLED', 'False')
+    app = create_app()
+    docs = make_documents(3)
+    app.repository.insert_many(docs)
+    archive_old_responses(app.repository, app.archive, older_than_days=30)
+    
+    with app.app_context():
+        response = SurveyResponse.find_by_id(str(docs[1]['_id']))
+        assert response.age == docs[1]['age']
+        assert SurveyResponse.find_by_id(str(ObjectId())) is None
+        
+        assert SurveyResponse.delete_all() == 3
+        assert SurveyResponse.get_statistics()['total_responses'] == 0
+        assert SurveyResponse.find_by_id(str(docs[1]['_id'])) is None
+    assert not list((tmp_path / 'archive').glob('date=*'))
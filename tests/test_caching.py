@@ -0,0 +1,55 @@
+import re
+
+import pytest
+
+from app import create_app
+from app.caching import CSRF_PLACEHOLDER, STATIC_MAX_AGE
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('STORAGE_BACKEND', 'sqlite')
+    monkeypatch.setenv('SQLITE_PATH', str(tmp_path / 'survey.db'))
+    monkeypatch.setenv('ARCHIVE_PATH', str(tmp_path / 'archive'))
+    monkeypatch.setenv('SHARED_CACHE_ENABLED', 'False')
+    monkeypatch.setenv('PAGE_CACHE_ENABLED', 'True')
+    return create_app()
+
+
+def test_cached_page_revalidates_with_etag(app):
+    client = app.test_client()
+    
+    first = client.get('/')
+    etag = first.headers['ETag']
+    again = client.get('/', headers={'If-None-Match': etag})
+    
+    assert first.status_code == 200
+    assert 'index' in app.page_cache._pages
+    assert again.status_code == 304
+    assert again.data == b''
+    assert client.get('/', headers={'If-None-Match': '"stale"'}).status_code == 200
+
+
+def test_cached_form_gets_a_fresh_csrf_token(app):
+    tokens = []
+    for _ in range(2):
+        response = app.test_client().get('/survey')
+        assert response.headers['Cache-Control'] == 'no-store'
+        html = response.get_data(as_text=True)
+        assert CSRF_PLACEHOLDER not in html
+        tokens.append(re.search(r'name="csrf_token" type="hidden" value="([^"]+)"', html).group(1))
+    
+    assert tokens[0] != tokens[1]
+
+
+def test_fingerprinted_static_urls_are_immutable(app):
+    client = app.test_client()
+    html = client.get('/').get_data(as_text=True)
+    url = re.search(r'href="(/static/css/style\.css\?v=\w+)"', html).group(1)
+    
+    fingerprinted = client.get(url)
+    plain = client.get('/static/css/style.css')
+    
+    assert fingerprinted.cache_control.immutable
+    assert fingerprinted.cache_control.max_age == STATIC_MAX_AGE
+    assert not plain.cache_control.immutable
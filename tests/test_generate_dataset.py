@@ -0,0 +1,36 @@
+import json
+from datetime import datetime
+
+import numpy as np
+
+from data_processing.generate_dataset import build_documents, generate_columns, generate_dataset
+
+CREATED_AT = datetime(2025, 1, 1)
+
+
+def make_ids(seed, shard=0, count=3):
+    columns = generate_columns(np.random.default_rng(0), count)
+    return [doc['_id'] for doc in build_documents(columns, [CREATED_AT] * count, shard, seed, 0)]
+
+
+def test_ids_are_reproducible():
+    assert make_ids(seed=42) == make_ids(seed=42)
+    assert len(set(make_ids(seed=42, count=100))) == 100
+    assert make_ids(seed=42)[0].generation_time.replace(tzinfo=None) == CREATED_AT
+
+
+def test_ids_differ_by_seed_and_shard():
+    # Seeds that agree in their low 16 bits must not share ids
+    ids = make_ids(seed=1) + make_ids(seed=1 + 2 ** 16) + make_ids(seed=1, shard=1) + make_ids(seed=2 ** 40)
+    
+    assert len(set(ids)) == len(ids)
+
+
+def test_ndjson_shards(tmp_path):
+    total, _ = generate_dataset(rows=25, shards=2, processes=1, seed=7, target='ndjson',
+                                output_dir=str(tmp_path), batch_size=10, end_date=CREATED_AT)
+    
+    assert total == 25
+    lines = [json.loads(line) for path in sorted(tmp_path.iterdir()) for line in path.read_text().splitlines()]
+    assert len(lines) == 25
+    assert len({line['_id']['$oid'] for line in lines}) == 25
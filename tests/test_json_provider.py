@@ -0,0 +1,56 @@
+import json
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+from bson import ObjectId
+from flask import Flask
+
+from app import json_provider
+from app.json_provider import FastJSONProvider
+
+PAYLOAD = {
+    '_id': ObjectId('65a1b2c3d4e5f60718293a4b'),
+    'created_at': datetime(2025, 1, 2, 3, 4, 5, 678000),
+    'day': date(2025, 1, 2),
+    'age': np.int64(30),
+    'ratio': np.float64(0.25),
+    'sums': np.array([1.5, 2.0]),
+    'gender': 'female',
+    'nested': [{'b': 1, 'a': None}, 'ünïcode']
+}
+EXPECTED = {
+    '_id': '65a1b2c3d4e5f60718293a4b',
+    'created_at': '2025-01-02T03:04:05.678000',
+    'day': '2025-01-02',
+    'age': 30,
+    'ratio': 0.25,
+    'sums': [1.5, 2.0],
+    'gender': 'female',
+    'nested': [{'a': None, 'b': 1}, 'ünïcode']
+}
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    return app
+
+
+def test_orjson_and_stdlib_agree(app, monkeypatch):
+    pytest.importorskip('orjson')
+    fast = app.json.dumps(PAYLOAD)
+    with app.test_request_context():
+        fast_body = app.json.response(PAYLOAD).get_data()
+    
+    monkeypatch.setattr(json_provider, 'orjson', None)
+    assert app.json.engine == 'json'
+    slow = app.json.dumps(PAYLOAD)
+    with app.test_request_context():
+        slow_body = app.json.response(PAYLOAD).get_data()
+    
+    assert json.loads(fast) == json.loads(slow) == EXPECTED
+    assert json.loads(fast_body) == json.loads(slow_body) == EXPECTED
+    # Both sort keys like Flask's default provider
+    assert list(json.loads(fast)) == list(json.loads(slow)) == sorted(PAYLOAD)
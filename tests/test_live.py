@@ -0,0 +1,99 @@
+import json
+import threading
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from app import create_app
+from app.live import DashboardBroadcaster, DashboardFollower
+from app.repositories import SQLiteSurveyRepository
+from app.schema import EXPENSE_CATEGORIES
+
+
+def make_totals():
+    return {'count': 1, 'age_sum': 30.0, 'income_sum': 1000.0,
+            'gender_counts': {'male': 1}, 'expense_sums': dict.fromkeys(EXPENSE_CATEGORIES, 10.0)}
+
+
+def make_document(gender='female'):
+    return {'_id': ObjectId(), 'age': 40, 'gender': gender, 'total_income': 2000.0,
+            'expenses': {'utilities': 50.0}, 'created_at': datetime.utcnow()}
+
+
+def test_reserve_respects_cap_under_concurrency():
+    broadcaster = DashboardBroadcaster(dumps=json.dumps, max_clients=3)
+    barrier = threading.Barrier(20)
+    results = []
+    
+    def reserve():
+        barrier.wait()
+        results.append(broadcaster.try_reserve())
+    
+    threads = [threading.Thread(target=reserve) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert results.count(True) == 3
+    assert broadcaster.clients == 3
+    broadcaster.release()
+    assert broadcaster.try_reserve()
+
+
+def test_deltas_do_not_modify_loaded_totals():
+    cached = make_totals()
+    broadcaster = DashboardBroadcaster(dumps=json.dumps)
+    broadcaster.ensure_totals(lambda: cached)
+    
+    broadcaster.publish([make_document()])
+    
+    assert cached == make_totals()
+    assert broadcaster._totals['count'] == 2
+    assert broadcaster._totals['gender_counts'] == {'male': 1, 'female': 1}
+
+
+def test_follower_applies_each_new_document_once(tmp_path):
+    repository = SQLiteSurveyRepository(str(tmp_path / 'survey.db'))
+    repository.insert_many([make_document('male')])
+    broadcaster = DashboardBroadcaster(dumps=json.dumps)
+    follower = DashboardFollower(repository, broadcaster)
+    broadcaster.try_reserve()
+    broadcaster.ensure_totals(make_totals)
+    
+    # The first poll only takes a baseline of what the loaded totals include
+    assert follower.poll() == 0
+    repository.insert_many([make_document(), make_document()])
+    assert follower.poll() == 2
+    assert follower.poll() == 0
+    
+    # Saves in this process are left to the follower
+    broadcaster.publish([make_document()])
+    assert broadcaster._totals['count'] == 3
+    assert broadcaster._totals['gender_counts'] == {'male': 1, 'female': 2}
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('STORAGE_BACKEND', 'sqlite')
+    monkeypatch.setenv('SQLITE_PATH', str(tmp_path / 'survey.db'))
+    monkeypatch.setenv('ARCHIVE_PATH', str(tmp_path / 'archive'))
+    monkeypatch.setenv('SHARED_CACHE_ENABLED', 'False')
+    monkeypatch.setenv('DASHBOARD_STREAM_MAX_CLIENTS', '1')
+    return create_app()
+
+
+def test_stream_slot_is_released_when_response_closes(app):
+    client = app.test_client()
+    
+    first = client.get('/admin/dashboard/stream', buffered=False)
+    assert first.status_code == 200
+    assert next(first.response).startswith(b'id: ')
+    assert client.get('/admin/dashboard/stream').status_code == 503
+    
+    first.close()
+    assert app.dashboard_stream.clients == 0
+    second = client.get('/admin/dashboard/stream', buffered=False)
+    assert second.status_code == 200
+    second.close()
@@ -0,0 +1,62 @@
+import json
+
+from app.query_profiler import QueryProfiler, fingerprint, load_statistics
+
+
+def find(filter_):
+    return fingerprint('find', {'find': 'survey_responses', 'filter': filter_}, 'db')
+
+
+def update(statements):
+    return fingerprint('update', {'update': 'survey_responses', 'updates': statements}, 'db')
+
+
+def test_value_lists_share_a_shape():
+    assert find({'gender': {'$in': ['male']}}) == find({'gender': {'$in': ['male', 'female', 'other']}})
+    assert find({'age': {'$nin': [1, 2]}}) == find({'age': {'$nin': [3]}})
+    assert find({'gender': {'$in': ['male']}}) != find({'gender': {'$nin': ['male']}})
+
+
+def test_or_branches_and_pipeline_stages_are_kept():
+    one_branch = find({'$or': [{'age': 1}]})
+    two_branches = find({'$or': [{'age': 1}, {'age': 2}]})
+    assert one_branch != two_branches
+    assert find({'$or': [{'age': 1}, {'gender': 'male'}]}) != find({'$or': [{'gender': 'male'}, {'age': 1}]})
+    
+    def aggregate(pipeline):
+        return fingerprint('aggregate', {'aggregate': 'survey_responses', 'pipeline': pipeline}, 'db')
+    
+    match, group = {'$match': {'age': 30}}, {'$group': {'_id': None, 'n': {'$sum': 1}}}
+    assert aggregate([match, match, group]) != aggregate([match, group])
+    assert aggregate([match, group]) != aggregate([group, match])
+
+
+def test_update_shape_keeps_upsert_flag_and_collapses_bulk_statements():
+    statement = {'q': {'_id': 1}, 'u': {'$set': {'age': 2}}}
+    upsert = dict(statement, upsert=True)
+    
+    assert update([statement]) != update([upsert])
+    assert update([upsert] * 3) == update([upsert])
+    assert '"upsert":"?"' in update([upsert])
+
+
+def test_statistics_files_are_merged(tmp_path):
+    first, second = QueryProfiler(stats_path=str(tmp_path)), QueryProfiler(stats_path=str(tmp_path))
+    first._stats = {'find a': {'calls': 2, 'getmores': 1, 'total_ms': 10.0, 'max_ms': 8.0,
+                               'slow': 0, 'errors': 0, 'plan': None}}
+    second._stats = {'find a': {'calls': 3, 'getmores': 0, 'total_ms': 30.0, 'max_ms': 20.0,
+                                'slow': 1, 'errors': 1, 'plan': 'IXSCAN age_1'},
+                     'find b': {'calls': 1, 'getmores': 0, 'total_ms': 1.0, 'max_ms': 1.0,
+                                'slow': 0, 'errors': 0, 'plan': None}}
+    
+    first.flush()
+    second.flush()
+    (tmp_path / 'torn.json').write_text('{"fingerprints": ')
+    
+    # One file per profiler, even within one process
+    assert len(list(tmp_path.glob('*.json'))) == 3
+    assert json.loads((tmp_path / f'{first.token}.json').read_text())['fingerprints'] == first._stats
+    merged = load_statistics(str(tmp_path))
+    assert merged['find a'] == {'calls': 5, 'getmores': 1, 'total_ms': 40.0, 'max_ms': 20.0,
+                                'slow': 1, 'errors': 1, 'plan': 'IXSCAN age_1'}
+    assert merged['find b']['calls'] == 1
@@ -0,0 +1,216 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pymongo
+import pytest
+from bson import ObjectId
+
+from app import columnar
+from app.columnar import ARROW_SCHEMA, read_table
+from app.repositories import MongoSurveyRepository, SQLiteSurveyRepository
+from app.schema import EXPENSE_CATEGORIES
+
+MONGO_TEST_URI = os.environ.get('MONGO_TEST_URI', 'mongodb://localhost:27017')
+
+# age, gender, total_income, expenses in EXPENSE_CATEGORIES order
+ROWS = [
+    (24, 'female', 1000.0, [100.0, 50.0, 0.0, 100.0, 50.0]),         # ratio 30, score 100
+    (30, 'male', 3000.0, [1000.0, 500.0, 500.0, 500.0, 300.0]),      # ratio 93.3, score 40
+    (40, 'female', 5000.0, [2000.0, 1000.0, 1000.0, 1500.0, 500.0]), # overspending, score 20
+    (60, 'other', 8000.0, [1000.0, 500.0, 500.0, 1000.0, 1000.0])    # ratio 50, score 100
+]
+
+
+def make_documents():
+    return [
+        {
+            '_id': ObjectId(),
+            'age': age,
+            'gender': gender,
+            'total_income': total_income,
+            'expenses': dict(zip(EXPENSE_CATEGORIES, expenses)),
+            'created_at': datetime(2025, 1, 1) + timedelta(days=day)
+        }
+        for day, (age, gender, total_income, expenses) in enumerate(ROWS)
+    ]
+
+
+@pytest.fixture(scope='module')
+def mongo_client():
+    client = pymongo.MongoClient(MONGO_TEST_URI, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command('ping')
+    except pymongo.errors.PyMongoError:
+        client.close()
+        pytest.skip(f'no MongoDB server at {MONGO_TEST_URI}')
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def mongo_repository(mongo_client):
+    db = mongo_client[f'survey_test_{uuid.uuid4().hex[:8]}']
+    repository = MongoSurveyRepository(db)
+    repository.ensure_indexes()
+    yield repository
+    mongo_client.drop_database(db.name)
+
+
+@pytest.fixture(params=['sqlite', 'mongodb'])
+def repository(request, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteSurveyRepository(str(tmp_path / 'survey.db'))
+    return request.getfixturevalue('mongo_repository')
+
+
+@pytest.fixture
+def documents(repository):
+    docs = make_documents()
+    repository.insert_many(docs)
+    return docs
+
+
+def test_insert_round_trip(repository):
+    doc = make_documents()[0]
+    
+    inserted_id = repository.insert(doc)
+    
+    assert inserted_id == doc['_id']
+    found = repository.find_by_id(str(doc['_id']))
+    assert found['age'] == 24
+    assert found['gender'] == 'female'
+    assert found['total_income'] == pytest.approx(1000.0)
+    assert found['expenses'] == pytest.approx(doc['expenses'])
+    assert found['created_at'] == doc['created_at']
+
+
+def test_upsert_replaces_by_id(repository, documents):
+    changed = [dict(doc, age=doc['age'] + 1) for doc in documents]
+    
+    repository.upsert_many(changed)
+    repository.upsert_many(changed)
+    
+    assert sorted(doc['age'] for doc in repository.find_all()) == [25, 31, 41, 61]
+
+
+@pytest.mark.parametrize('criteria, ages', [
+    ({}, [24, 30, 40, 60]),
+    ({'gender': 'Female'}, [24, 40]),
+    ({'min_age': 30, 'max_age': 45}, [30, 40]),
+    ({'min_income': 2000, 'max_income': 6000}, [30, 40]),
+    ({'overspending': True}, [40]),
+    ({'overspending': False, 'gender': 'female'}, [24]),
+    ({'min_health_score': 80}, [24, 60]),
+    ({'max_health_score': 40, 'min_age': 35}, [40])
+])
+def test_iter_record_batches_criteria(repository, documents, criteria, ages):
+    table = read_table(repository.iter_record_batches(columns=['age'], **criteria), columns=['age'])
+    assert sorted(table.column('age').to_pylist()) == ages
+
+
+def test_get_statistics(repository, documents):
+    statistics = repository.get_statistics()
+    
+    assert statistics['total_responses'] == 4
+    assert statistics['avg_age'] == pytest.approx(38.5)
+    assert statistics['avg_income'] == pytest.approx(4250.0)
+    assert statistics['gender_distribution'] == {'female': 2, 'male': 1, 'other': 1}
+    for index, category in enumerate(EXPENSE_CATEGORIES):
+        assert statistics['expense_totals'][category] == pytest.approx(sum(row[3][index] for row in ROWS))
+
+
+def test_get_statistics_empty(repository):
+    assert repository.get_statistics()['total_responses'] == 0
+
+
+def test_crosstab(repository, documents):
+    groups = repository.crosstab(['gender', 'income_band'], ['total_income', 'utilities'])
+    
+    by_key = {(group['key']['gender'], group['key']['income_band']): group for group in groups}
+    assert set(by_key) == {('female', '<2000'), ('male', '2000-3999'),
+                           ('female', '4000-5999'), ('other', '6000-9999')}
+    assert by_key[('female', '4000-5999')]['count'] == 1
+    assert by_key[('female', '4000-5999')]['sums'] == pytest.approx({'total_income': 5000.0, 'utilities': 2000.0})
+
+
+def test_iter_record_batches(repository, documents):
+    batches = list(repository.iter_record_batches(batch_size=3))
+    
+    assert [batch.num_rows for batch in batches] == [3, 1]
+    table = read_table(batches)
+    assert table.schema == ARROW_SCHEMA
+    rows = sorted(table.to_pylist(), key=lambda row: row['age'])
+    assert [row['id'] for row in rows] == [str(doc['_id']) for doc in documents]
+    assert rows[2]['school_fees'] == pytest.approx(1000.0)
+    assert rows[2]['created_at'] == documents[2]['created_at']
+
+
+def test_iter_record_batches_pushes_down_columns_and_criteria(repository, documents):
+    table = read_table(repository.iter_record_batches(columns=['age', 'gender'], gender='female', min_age=30),
+                       columns=['age', 'gender'])
+    
+    assert table.column_names == ['age', 'gender']
+    assert table.to_pylist() == [{'age': 40, 'gender': 'female'}]
+
+
+def test_collection_version_bumps_on_every_write(repository):
+    docs = make_documents()
+    versions = [repository.collection_version()]
+    
+    repository.insert(docs[0])
+    versions.append(repository.collection_version())
+    repository.insert_many(docs[1:])
+    versions.append(repository.collection_version())
+    repository.upsert_many(docs[:1])
+    versions.append(repository.collection_version())
+    repository.delete_by_ids([docs[0]['_id']])
+    versions.append(repository.collection_version())
+    repository.delete_all()
+    versions.append(repository.collection_version())
+    
+    assert versions == sorted(set(versions))
+
+
+def test_mongo_decoders_agree(mongo_repository, monkeypatch):
+    pytest.importorskip('pymongoarrow')
+    mongo_repository.insert_many(make_documents())
+    
+    assert columnar.mongo_decoder() == 'pymongoarrow'
+    batches = list(mongo_repository.iter_record_batches(batch_size=3))
+    # Decoded one server batch at a time rather than from one whole-result table
+    assert [batch.num_rows for batch in batches] == [3, 1]
+    arrow = read_table(batches)
+    monkeypatch.setattr(columnar, 'Schema', None)
+    assert columnar.mongo_decoder() == 'cursor'
+    cursor = read_table(mongo_repository.iter_record_batches(batch_size=3))
+    
+    assert arrow.schema == cursor.schema == ARROW_SCHEMA
+    assert arrow.sort_by('age').equals(cursor.sort_by('age'))
+
+
+def test_compact_schema_migration(mongo_repository):
+    from data_processing.migrate_compact_schema import MIGRATION_ID, migrate_to_compact_schema
+    legacy = make_documents()
+    # Written before the compact schema, with amounts that are not whole cents
+    for doc in legacy:
+        doc['total_income'] += 0.004
+    mongo_repository.collection.insert_many(legacy)
+    version = mongo_repository.collection_version()
+    
+    assert migrate_to_compact_schema(mongo_repository.db, batch_size=3) == 4
+    
+    assert mongo_repository.collection_version() > version
+    checkpoint = mongo_repository.db.migrations.find_one({'_id': MIGRATION_ID})
+    assert 'completed_at' in checkpoint and 'last_id' not in checkpoint
+    assert sorted(doc['total_income'] for doc in mongo_repository.find_all()) == [1000.0, 3000.0, 5000.0, 8000.0]
+    assert migrate_to_compact_schema(mongo_repository.db) == 0
+
+
+def test_generated_rows_are_skipped_on_rerun(mongo_repository):
+    from data_processing.generate_dataset import insert_documents
+    docs = make_documents()
+    
+    assert insert_documents(mongo_repository.collection, docs[:2]) == 2
+    assert insert_documents(mongo_repository.collection, [dict(doc) for doc in docs]) == 2
+    assert mongo_repository.collection.count_documents({}) == 4
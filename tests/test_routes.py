@@ -0,0 +1,42 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from app import create_app
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv('STORAGE_BACKEND', 'sqlite')
+    monkeypatch.setenv('SQLITE_PATH', str(tmp_path / 'survey.db'))
+    monkeypatch.setenv('ARCHIVE_PATH', str(tmp_path / 'archive'))
+    monkeypatch.setenv('SHARED_CACHE_ENABLED', 'False')
+    app = create_app()
+    app.repository.insert_many([
+        {'_id': ObjectId(), 'age': age, 'gender': gender, 'total_income': 3000.0,
+         'expenses': {'utilities': 100.0}, 'created_at': datetime(2025, 1, 1)}
+        for age, gender in [(24, 'female'), (30, 'male'), (40, 'female')]
+    ])
+    return app.test_client()
+
+
+def test_crosstab_ignores_repeated_names(client):
+    repeated = client.get('/api/analytics/crosstab?dimensions=gender,gender&fields=utilities,utilities'
+                          '&measures=count,count')
+    single = client.get('/api/analytics/crosstab?dimensions=gender&fields=utilities&measures=count')
+    
+    assert repeated.status_code == 200
+    body = repeated.get_json()
+    assert body['dimensions'] == ['gender']
+    body.pop('cached')
+    expected = single.get_json()
+    expected.pop('cached')
+    assert body == expected
+
+
+def test_crosstab_rejects_unknown_dimension(client):
+    response = client.get('/api/analytics/crosstab?dimensions=gender,shoe_size')
+    
+    assert response.status_code == 400
+    assert 'shoe_size' in response.get_json()['error']
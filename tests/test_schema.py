@@ -0,0 +1,15 @@
+import pytest
+
+from app.schema import FIELDS, financial_fields
+from data_processing.user_processor import User
+
+
+@pytest.mark.parametrize('expense_cents', [500040, 500050, 700001, 899999, 1000000, 1000001])
+def test_health_score_matches_user(expense_cents):
+    income_cents = 1000000
+    fields = financial_fields(income_cents, [expense_cents])
+    user = User(age=30, gender='female', total_income=income_cents / 100,
+                expenses={'utilities': expense_cents / 100})
+    
+    assert fields[FIELDS['health_score']] == user.get_financial_health_score()
+    assert fields[FIELDS['expense_ratio']] == round(user.calculate_expense_ratio(), 2)
@@ -0,0 +1,91 @@
+import json
+import multiprocessing
+import os
+import time
+
+from app.shared_cache import SharedResultCache, layout_path
+
+
+def make_cache(tmp_path, **kwargs):
+    return SharedResultCache(str(tmp_path / 'cache'), dumps=json.dumps, **kwargs)
+
+
+def slow_count(cache_path, counter_path):
+    cache = SharedResultCache(cache_path, dumps=json.dumps)
+    
+    def compute():
+        with open(counter_path, 'a') as f:
+            f.write('x')
+        time.sleep(0.5)
+        return {'total_responses': 4}
+    
+    return cache.get_or_compute('statistics', 1, compute)[0]
+
+
+def test_round_trip_and_version_miss(tmp_path):
+    cache = make_cache(tmp_path)
+    
+    assert cache.get_or_compute('statistics', 1, lambda: {'total': 4}) == ({'total': 4}, False)
+    assert cache.get_or_compute('statistics', 1, lambda: {'total': 5}) == ({'total': 4}, True)
+    assert make_cache(tmp_path).get('statistics', 1) == {'total': 4}
+    assert cache.get('statistics', 2) is None
+    assert cache.get_or_compute('statistics', 2, lambda: {'total': 5}) == ({'total': 5}, False)
+
+
+def test_layout_change_uses_a_new_file(tmp_path):
+    cache = make_cache(tmp_path, slots=8, slot_size=4096)
+    cache.get_or_compute('statistics', 1, lambda: {'total': 4})
+    size = os.path.getsize(cache.path)
+    
+    resized = make_cache(tmp_path, slots=16, slot_size=4096)
+    
+    assert resized.path != cache.path
+    assert resized.path == layout_path(str(tmp_path / 'cache'), 16, 4096)
+    assert os.path.getsize(cache.path) == size
+    assert cache.get('statistics', 1) == {'total': 4}
+    assert resized.get('statistics', 1) is None
+
+
+def test_colliding_keys_both_stay_cached(tmp_path):
+    # With two slots every pair of keys shares a candidate slot
+    cache = make_cache(tmp_path, slots=2, slot_size=4096)
+    keys = [f'crosstab-{i}' for i in range(20)]
+    first = keys[0]
+    second = next(key for key in keys[1:] if len(set(cache._slots(key)[1]) | set(cache._slots(first)[1])) == 2)
+    
+    cache.get_or_compute(first, 1, lambda: 'a')
+    cache.get_or_compute(second, 1, lambda: 'b')
+    cache.get_or_compute(first, 2, lambda: 'c')
+    
+    assert cache.get(first, 2) == 'c'
+    assert cache.get(second, 1) == 'b'
+    assert cache.evictions == 0
+
+
+def test_eviction_replaces_the_oldest_entry(tmp_path):
+    cache = make_cache(tmp_path, slots=1, slot_size=4096)
+    
+    cache.get_or_compute('first', 1, lambda: 'a')
+    cache.get_or_compute('second', 1, lambda: 'b')
+    
+    assert cache.get('first', 1) is None
+    assert cache.get('second', 1) == 'b'
+    assert cache.evictions == 1
+
+
+def test_oversized_result_is_not_cached(tmp_path):
+    cache = make_cache(tmp_path, slots=2, slot_size=256)
+    
+    assert cache.get_or_compute('statistics', 1, lambda: 'x' * 1000) == ('x' * 1000, False)
+    assert cache.get('statistics', 1) is None
+
+
+def test_one_process_computes_a_miss(tmp_path):
+    cache_path = str(tmp_path / 'cache')
+    counter_path = tmp_path / 'computed'
+    
+    with multiprocessing.get_context('fork').Pool(4) as pool:
+        results = pool.starmap(slow_count, [(cache_path, str(counter_path))] * 4)
+    
+    assert results == [{'total_responses': 4}] * 4
+    assert counter_path.read_text() == 'x'
@@ -0,0 +1,86 @@
+import os
+import threading
+
+import pytest
+from bson import ObjectId
+
+from app import create_app
+from app.models import SurveyResponse
+from app.spool import SpoolError, WriteSpool, read_segment
+
+
+def _docs(count):
+    return [{'_id': ObjectId(), 'age': 30 + i} for i in range(count)]
+
+
+def test_append_is_readable_after_seal(tmp_path):
+    spool = WriteSpool(str(tmp_path), group_commit_ms=0)
+    docs = _docs(3)
+    
+    assert spool.append_many(docs) == [doc['_id'] for doc in docs]
+    spool.seal()
+    
+    segments = spool.sealed_segments()
+    assert len(segments) == 1
+    assert read_segment(segments[0]) == docs
+
+
+def test_segment_of_live_writer_is_not_reclaimed(tmp_path):
+    writer = WriteSpool(str(tmp_path), group_commit_ms=0)
+    writer.append_many(_docs(2))
+    
+    # Another worker sharing the spool directory
+    other = WriteSpool(str(tmp_path), group_commit_ms=0)
+    assert other.sealed_segments() == []
+    assert len(list(tmp_path.glob('*.active'))) == 1
+
+
+def test_orphaned_segment_with_reused_pid_is_reclaimed(tmp_path):
+    # Left by a crashed container whose worker PID now belongs to a live process
+    docs = _docs(2)
+    writer = WriteSpool(str(tmp_path), group_commit_ms=0)
+    writer.append_many(docs)
+    orphan = tmp_path / f'segment-1-{os.getppid()}.active'
+    os.replace(writer._segment, orphan)
+    writer._file.close()
+    writer._file = writer._segment = None
+    
+    segments = WriteSpool(str(tmp_path), group_commit_ms=0).sealed_segments()
+    assert [os.path.basename(segment) for segment in segments] == [f'segment-1-{os.getppid()}.sealed']
+    assert read_segment(segments[0]) == docs
+
+
+def test_failed_write_does_not_block_later_writers(tmp_path, monkeypatch):
+    spool = WriteSpool(str(tmp_path), group_commit_ms=0)
+    
+    def broken_write(data):
+        raise ValueError('bad frame')
+    
+    monkeypatch.setattr(spool, '_write', broken_write)
+    with pytest.raises(SpoolError, match='bad frame'):
+        spool.append_many(_docs(1))
+    monkeypatch.undo()
+    
+    # A leader left stuck in _flushing would make this wait forever
+    writer = threading.Thread(target=spool.append_many, args=(_docs(1),))
+    writer.start()
+    writer.join(timeout=5)
+    assert not writer.is_alive()
+    assert spool._durable_seq == 2
+
+
+def test_submissions_are_spooled_when_mongo_is_down_at_startup(tmp_path, monkeypatch):
+    monkeypatch.setenv('MONGO_URI', 'mongodb://127.0.0.1:1/healthcare_survey?serverSelectionTimeoutMS=100')
+    monkeypatch.setenv('SPOOL_PATH', str(tmp_path / 'spool'))
+    monkeypatch.setenv('ARCHIVE_PATH', str(tmp_path / 'archive'))
+    monkeypatch.setenv('QUERY_PROFILER_ENABLED', 'False')
+    monkeypatch.setenv('SHARED_CACHE_ENABLED', 'False')
+    monkeypatch.setenv('SPOOL_REPLAY_INTERVAL', '3600')
+    app = create_app()
+    
+    assert app.repository is not None
+    with app.app_context():
+        response = SurveyResponse(age=30, gender='male', total_income=1000, expenses={'utilities': 10})
+        assert response.save() == response._id
+    app.spool.seal()
+    assert [doc['_id'] for doc in read_segment(app.spool.sealed_segments()[0])] == [response._id]
@@ -0,0 +1,126 @@
+import os
+
+import numpy as np
+import pytest
+
+from app.models import SurveyResponse
+from data_processing.user_processor import UserDataProcessor
+
+EXPENSES = {'utilities': 100, 'entertainment': 50, 'school_fees': 0, 'shopping': 25, 'healthcare': 10}
+
+
+def test_extra_expense_categories_are_kept():
+    processor = UserDataProcessor()
+    
+    report = processor.add_users_from_data([
+        {'_id': 'a', 'age': 30, 'gender': 'Male', 'total_income': 1000, 'expenses': dict(EXPENSES, rent=300)}
+    ])
+    
+    assert report == {'accepted': 1, 'rejects': []}
+    user = processor.users[0]
+    assert user.expenses['rent'] == 300
+    assert user.calculate_total_expenses() == 485
+    assert user.gender == 'male'
+
+
+def test_non_numeric_expense_rejects_only_its_row():
+    processor = UserDataProcessor()
+    
+    report = processor.add_users_from_data([
+        {'_id': 'a', 'age': 30, 'gender': 'male', 'total_income': 1000, 'expenses': EXPENSES},
+        {'_id': 'b', 'age': 41, 'gender': 'female', 'total_income': 2000, 'expenses': {'utilities': 'n/a'}},
+        {'_id': 'c', 'age': '25', 'gender': 'female', 'total_income': '500', 'expenses': {'utilities': '12.5'}},
+        {'_id': 'd', 'age': -1, 'gender': 'male', 'total_income': 1000, 'expenses': {}},
+    ])
+    
+    assert report['accepted'] == 2
+    assert [reject['index'] for reject in report['rejects']] == [1, 3]
+    assert [user.user_id for user in processor.users] == ['a', 'c']
+    assert processor.users[1].expenses == {'utilities': 12.5}
+
+
+def test_survey_responses_and_chunks():
+    responses = [SurveyResponse(age=20 + i, gender='female', total_income=100, expenses=EXPENSES) for i in range(5)]
+    processor = UserDataProcessor(chunk_size=2, spill=False)
+    
+    report = processor.add_users_from_data(responses)
+    
+    assert report == {'accepted': 5, 'rejects': []}
+    assert processor.get_statistics()['total_users'] == 5
+
+
+def test_close_removes_own_spill_dir():
+    responses = [SurveyResponse(age=30, gender='male', total_income=100, expenses=EXPENSES) for _ in range(5)]
+    
+    with UserDataProcessor(chunk_size=2) as processor:
+        processor.add_users_from_data(responses)
+        spill_dir = processor.spill_dir
+        assert os.listdir(spill_dir)
+    
+    assert not os.path.exists(spill_dir)
+    assert len(processor) == 0
+
+
+def test_close_keeps_given_spill_dir(tmp_path):
+    processor = UserDataProcessor(chunk_size=2, spill_dir=str(tmp_path))
+    processor.add_users_from_data([SurveyResponse(age=30, gender='male', total_income=100, expenses=EXPENSES)
+                                   for _ in range(5)])
+    
+    processor.close()
+    
+    assert tmp_path.exists()
+    assert not os.listdir(tmp_path)
+
+
+def test_generator_input_without_chunks():
+    records = ({'_id': str(i), 'age': 30 + i, 'gender': 'male', 'total_income': 1000, 'expenses': EXPENSES}
+               for i in range(3))
+    processor = UserDataProcessor()
+    
+    report = processor.add_users_from_data(records)
+    
+    assert report == {'accepted': 3, 'rejects': []}
+    assert [user.user_id for user in processor.users] == ['0', '1', '2']
+
+
+def test_record_without_id_exports_empty_user_id(tmp_path):
+    processor = UserDataProcessor()
+    processor.add_users_from_data([
+        {'age': 30, 'gender': 'male', 'total_income': 1000, 'expenses': EXPENSES},
+        {'user_id': 'u2', 'age': 31, 'gender': 'female', 'total_income': 1000, 'expenses': EXPENSES},
+    ])
+    
+    assert [user.user_id for user in processor.users] == [None, 'u2']
+    assert processor.export_to_pandas()['user_id'].tolist() == [None, 'u2']
+    path = tmp_path / 'users.csv'
+    processor.export_to_csv(str(path))
+    assert path.read_text().splitlines()[1].startswith(',30,male,')
+
+
+def test_chunked_statistics_match_in_memory():
+    rng = np.random.default_rng(7)
+    records = [
+        {'_id': str(i), 'age': int(age), 'gender': gender, 'total_income': float(income),
+         'expenses': {category: float(amount) for category, amount in zip(EXPENSES, amounts)}}
+        for i, (age, gender, income, amounts) in enumerate(zip(
+            rng.integers(18, 90, 5000), rng.choice(['male', 'female', 'other'], 5000),
+            rng.lognormal(8, 0.6, 5000).round(2), rng.exponential(200, (5000, len(EXPENSES))).round(2)
+        ))
+    ]
+    in_memory = UserDataProcessor()
+    in_memory.add_users_from_data(records)
+    with UserDataProcessor(chunk_size=700) as chunked:
+        chunked.add_users_from_data(records)
+        
+        expected, actual = in_memory.get_statistics(), chunked.get_statistics()
+    
+    for field in ('age_stats', 'income_stats'):
+        assert set(actual[field]) == set(expected[field]) == {'mean', 'median', 'min', 'max'}
+        # Medians come from the quantile sketch, within 1% of the exact value
+        assert actual[field]['median'] == pytest.approx(expected[field]['median'], rel=0.01)
+        for key in ('mean', 'min', 'max'):
+            assert actual[field][key] == pytest.approx(expected[field][key])
+    assert actual['total_users'] == expected['total_users'] == 5000
+    assert actual['gender_distribution'] == expected['gender_distribution']
+    assert actual['expense_stats'] == pytest.approx(expected['expense_stats'])
+    assert actual['financial_health'] == pytest.approx(expected['financial_health'])